@@ -1,19 +1,47 @@
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, current_app, Response
+from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, current_app, Response, g
+from flask import stream_template, has_request_context, abort, send_file
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from flask_wtf.csrf import CSRFProtect, CSRFError
+from flask_wtf.csrf import CSRFProtect, CSRFError, generate_csrf
 from flask_migrate import Migrate
 from flask_cors import CORS
 from urllib.parse import urlparse
 from typing import Dict, Any, Optional
+from concurrent.futures import wait
 import requests
+import copy
+import hashlib
+import hmac
+import json
 import re
+import threading
+import time
 import os
 import logging
 import sys
-from models import db, User, Repository
+from models import db, User, UserSnapshot, Repository
+from transport import BackendTransport
+from token_cache import TokenVerificationCache
+from token_store import TokenRefresher, create_token_store
+from cache import TTLCache, json_size
+from singleflight import SingleFlight
+from pagination import PageFiller, decode_cursor, encode_cursor
+from dependencies import DependencyResolver
+from search_index import ModuleSearchIndex
+from typeahead import TypeaheadIndex
+from streaming import streamed_json_list
+import profiling
+from profiling import RequestProfiler
+from tracing import ContextExecutor, traced, tracer
+import resilience
+from resilience import breakers, guarded, is_unavailable
+from metrics import registry, timed, cache_collector, count_statement, REQUEST_SECONDS, DB_QUERIES, DB_STATEMENTS
+from versions import VersionIndex
 from forms import LoginForm, RegistrationForm, ProfileForm, RepositoryForm, AdminUserForm
 from dotenv import load_dotenv
 from werkzeug.exceptions import HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 
 # Set up logging to stdout
 logging.basicConfig(
@@ -33,8 +61,8 @@ logger.info("Flask app created with CORS enabled")
 
 # Database Configuration with error handling
 try:
-    # Build PostgreSQL URL from environment variables
-    db_url = f"postgresql://{os.environ.get('DB_USER', 'admin')}:{os.environ.get('DB_PASSWORD', 'adminpass')}@{os.environ.get('DB_HOST', 'postgres')}:{os.environ.get('DB_PORT', '5432')}/{os.environ.get('DB_NAME', 'moduledb')}"
+    # DATABASE_URL wins (e.g. sqlite for benchmarks); otherwise build the PostgreSQL URL from its parts
+    db_url = os.environ.get('DATABASE_URL') or f"postgresql://{os.environ.get('DB_USER', 'admin')}:{os.environ.get('DB_PASSWORD', 'adminpass')}@{os.environ.get('DB_HOST', 'postgres')}:{os.environ.get('DB_PORT', '5432')}/{os.environ.get('DB_NAME', 'moduledb')}"
     
     app.config.update(
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-key-please-change'),
@@ -42,7 +70,88 @@ try:
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
         WTF_CSRF_ENABLED=True,
         WTF_CSRF_SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-key-please-change'),
-        BACKEND_URL=os.environ.get('BACKEND_URL', 'http://localhost:8000')  # Changed default to 8000
+        BACKEND_URL=os.environ.get('BACKEND_URL', 'http://localhost:8000'),  # Changed default to 8000
+        # Backend connection pool
+        BACKEND_POOL_CONNECTIONS=int(os.environ.get('BACKEND_POOL_CONNECTIONS', 10)),
+        BACKEND_POOL_MAXSIZE=int(os.environ.get('BACKEND_POOL_MAXSIZE', 20)),
+        BACKEND_CONNECT_TIMEOUT=float(os.environ.get('BACKEND_CONNECT_TIMEOUT', 3.05)),
+        BACKEND_READ_TIMEOUT=float(os.environ.get('BACKEND_READ_TIMEOUT', 10)),
+        BACKEND_MAX_RETRIES=int(os.environ.get('BACKEND_MAX_RETRIES', 2)),
+        BACKEND_RETRY_BACKOFF=float(os.environ.get('BACKEND_RETRY_BACKOFF', 0.2)),
+        # Deadlines (seconds): one backend call including retries, and all backend calls of a request
+        BACKEND_CALL_BUDGET=float(os.environ.get('BACKEND_CALL_BUDGET', 8)),
+        BACKEND_REQUEST_BUDGET=float(os.environ.get('BACKEND_REQUEST_BUDGET', 15)),
+        # Per-endpoint circuit breaker: open after this many consecutive failures, probe again after the timeout
+        CIRCUIT_BREAKER_ENABLED=os.environ.get('CIRCUIT_BREAKER_ENABLED', 'true').lower() == 'true',
+        CIRCUIT_FAILURE_THRESHOLD=int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5)),
+        CIRCUIT_RESET_TIMEOUT=float(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30)),
+        # Token verification cache
+        TOKEN_VERIFY_TTL=float(os.environ.get('TOKEN_VERIFY_TTL', 60)),
+        TOKEN_EXPIRY_MARGIN=float(os.environ.get('TOKEN_EXPIRY_MARGIN', 30)),
+        # Module search result cache
+        SEARCH_CACHE_TTL=float(os.environ.get('SEARCH_CACHE_TTL', 30)),
+        SEARCH_CACHE_STALE_TTL=float(os.environ.get('SEARCH_CACHE_STALE_TTL', 300)),
+        SEARCH_CACHE_MAX_ENTRIES=int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 1024)),
+        SEARCH_CACHE_MAX_BYTES=int(os.environ.get('SEARCH_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+        # Resolved download URLs of published (immutable) module versions
+        DOWNLOAD_CACHE_TTL=float(os.environ.get('DOWNLOAD_CACHE_TTL', 86400)),
+        DOWNLOAD_CACHE_MAX_ENTRIES=int(os.environ.get('DOWNLOAD_CACHE_MAX_ENTRIES', 10000)),
+        DOWNLOAD_CACHE_PUBLIC=os.environ.get('DOWNLOAD_CACHE_PUBLIC', 'false').lower() == 'true',
+        # Version documents kept for conditional revalidation against the backend
+        VERSIONS_CACHE_TTL=float(os.environ.get('VERSIONS_CACHE_TTL', 3600)),
+        VERSIONS_CACHE_MAX_ENTRIES=int(os.environ.get('VERSIONS_CACHE_MAX_ENTRIES', 4096)),
+        VERSIONS_CACHE_MAX_BYTES=int(os.environ.get('VERSIONS_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+        # Connection limit for the asyncio backend client used under ASGI (see asgi.py)
+        ASYNC_BACKEND_MAX_CONNECTIONS=int(os.environ.get('ASYNC_BACKEND_MAX_CONNECTIONS', 200)),
+        # Search pagination: backend batches fetched to fill one page of accessible results
+        SEARCH_MAX_BATCHES=int(os.environ.get('SEARCH_MAX_BATCHES', 5)),
+        SEARCH_MAX_BATCH_SIZE=int(os.environ.get('SEARCH_MAX_BATCH_SIZE', 100)),
+        # Concurrent backend fan-out (batch and aggregate endpoints)
+        BACKEND_FANOUT_WORKERS=int(os.environ.get('BACKEND_FANOUT_WORKERS', 16)),
+        BATCH_MAX_ITEMS=int(os.environ.get('BATCH_MAX_ITEMS', 50)),
+        # Module page: overall deadline for the parallel sub-calls and per-part cache TTLs
+        MODULE_PAGE_DEADLINE=float(os.environ.get('MODULE_PAGE_DEADLINE', 2.0)),
+        MODULE_VERSIONS_TTL=float(os.environ.get('MODULE_VERSIONS_TTL', 60)),
+        MODULE_DETAILS_TTL=float(os.environ.get('MODULE_DETAILS_TTL', 3600)),
+        MODULE_DEPENDENCIES_TTL=float(os.environ.get('MODULE_DEPENDENCIES_TTL', 86400)),
+        MODULE_STATS_TTL=float(os.environ.get('MODULE_STATS_TTL', 300)),
+        # Upper bound on nodes in a resolved transitive dependency graph
+        DEPENDENCY_MAX_NODES=int(os.environ.get('DEPENDENCY_MAX_NODES', 1000)),
+        # Local full-text module index synced from the backend search API
+        SEARCH_INDEX_ENABLED=os.environ.get('SEARCH_INDEX_ENABLED', 'false').lower() == 'true',
+        SEARCH_INDEX_PATH=os.environ.get('SEARCH_INDEX_PATH', os.path.join(app.instance_path, 'search_index.db')),
+        # Whether this process may sync the index; one process holding the file lock does it
+        SEARCH_INDEX_SYNC=os.environ.get('SEARCH_INDEX_SYNC', 'true').lower() == 'true',
+        SEARCH_INDEX_SYNC_INTERVAL=float(os.environ.get('SEARCH_INDEX_SYNC_INTERVAL', 300)),
+        SEARCH_INDEX_MAX_STALENESS=float(os.environ.get('SEARCH_INDEX_MAX_STALENESS', 900)),
+        # Token used by background jobs that call the backend outside a user request
+        BACKEND_SERVICE_TOKEN=os.environ.get('BACKEND_SERVICE_TOKEN'),
+        # /api/repositories keyset pagination
+        REPOSITORIES_PAGE_SIZE=int(os.environ.get('REPOSITORIES_PAGE_SIZE', 100)),
+        REPOSITORIES_MAX_PAGE_SIZE=int(os.environ.get('REPOSITORIES_MAX_PAGE_SIZE', 500)),
+        # Rows fetched and encoded per chunk by streaming listings
+        STREAM_CHUNK_SIZE=int(os.environ.get('STREAM_CHUNK_SIZE', 500)),
+        # How long load_user may serve a user without re-reading the row
+        IDENTITY_CACHE_TTL=float(os.environ.get('IDENTITY_CACHE_TTL', 30)),
+        IDENTITY_CACHE_MAX_ENTRIES=int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000)),
+        # Backend JWTs live here instead of on the user row. Required (redis://...) for any
+        # deployment with more than one worker; the in-memory fallback is for local development
+        TOKEN_STORE_URL=os.environ.get('TOKEN_STORE_URL'),
+        TOKEN_STORE_DEFAULT_TTL=float(os.environ.get('TOKEN_STORE_DEFAULT_TTL', 86400)),
+        TOKEN_STORE_GRACE=float(os.environ.get('TOKEN_STORE_GRACE', 3600)),
+        # Refresh tokens in the background once this fraction of their lifetime has passed
+        TOKEN_REFRESH_AT=float(os.environ.get('TOKEN_REFRESH_AT', 0.75)),
+        # Bearer token for Prometheus scrapes of /metrics; admins can always read it
+        METRICS_TOKEN=os.environ.get('METRICS_TOKEN'),
+        # Request profiling: admins opt in per request with X-Profile: 1 or ?profile=1;
+        # PROFILE_SAMPLE_EVERY=N also profiles one in N requests at random (0 = never)
+        PROFILING_ENABLED=os.environ.get('PROFILING_ENABLED', 'true').lower() == 'true',
+        PROFILE_SAMPLE_EVERY=int(os.environ.get('PROFILE_SAMPLE_EVERY', 0)),
+        PROFILE_DIR=os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles')),
+        PROFILE_KEEP=int(os.environ.get('PROFILE_KEEP', 100)),
+        # Request tracing to a local JSON-lines file, one span per line
+        TRACING_ENABLED=os.environ.get('TRACING_ENABLED', 'false').lower() == 'true',
+        TRACE_FILE=os.environ.get('TRACE_FILE', os.path.join(app.instance_path, 'traces.jsonl'))
     )
     logger.info(f"App configuration loaded with backend URL: {app.config['BACKEND_URL']}")
 except Exception as e:
@@ -67,6 +176,120 @@ except Exception as e:
     logger.error(f"Error initializing extensions: {e}")
     sys.exit(1)
 
+tracer.configure(app.config['TRACING_ENABLED'], app.config['TRACE_FILE'])
+breakers.configure(
+    app.config['CIRCUIT_BREAKER_ENABLED'],
+    app.config['CIRCUIT_FAILURE_THRESHOLD'],
+    app.config['CIRCUIT_RESET_TIMEOUT']
+)
+
+# Registered ahead of check_token so its backend round trip is part of the measured time
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.db_queries = 0
+    g.trace_span = tracer.start(
+        'request', traceparent=request.headers.get('traceparent'), method=request.method, path=request.path
+    )
+    g.trace_token = tracer.activate(g.trace_span)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        REQUEST_SECONDS.labels(route, request.method, str(response.status_code)).observe(time.perf_counter() - started)
+        DB_QUERIES.labels(route).observe(g.get('db_queries', 0))
+    trace_span = g.get('trace_span')
+    if trace_span is not None:
+        trace_span.set(route=request.url_rule.rule if request.url_rule is not None else None, status=response.status_code)
+        response.headers['X-Trace-Id'] = trace_span.trace_id
+    return response
+
+@app.teardown_request
+def end_request_trace(error=None):
+    trace_span = g.pop('trace_span', None)
+    if trace_span is not None:
+        tracer.end(trace_span, error)
+        tracer.deactivate(g.pop('trace_token', None))
+
+# Also ahead of check_token, whose /auth/verify call spends from the same budget
+@app.before_request
+def start_backend_budget():
+    g.budget_token = resilience.begin_request(app.config['BACKEND_REQUEST_BUDGET'])
+
+@app.after_request
+def report_degraded(response):
+    reasons = resilience.degraded()
+    if reasons:
+        # Parts of this response were served from caches while the backend was unavailable
+        response.headers['X-Degraded'] = ', '.join(reasons)
+    return response
+
+@app.teardown_request
+def end_backend_budget(error=None):
+    resilience.end_request(g.pop('budget_token', None))
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_db_statement(conn, cursor, statement, parameters, context, executemany):
+    DB_STATEMENTS.inc()
+    if has_request_context():
+        g.db_queries = g.get('db_queries', 0) + 1
+    else:
+        count_statement()
+    if profiling.active() is not None:
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def time_db_statement(conn, cursor, statement, parameters, context, executemany):
+    profile = profiling.active()
+    started = conn.info.get('profile_started')
+    if profile is not None and started:
+        profile.db_seconds += time.perf_counter() - started.pop()
+        profile.db_queries += 1
+
+profiler = RequestProfiler(
+    app.config['PROFILE_DIR'],
+    enabled=app.config['PROFILING_ENABLED'],
+    sample_every=app.config['PROFILE_SAMPLE_EVERY'],
+    keep=app.config['PROFILE_KEEP']
+)
+
+@app.before_request
+def start_profiling():
+    if not profiler.active:
+        return
+    requested = profiler.enabled and (request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1')
+    if requested and not (current_user.is_authenticated and current_user.role == 'admin'):
+        requested = False
+    if requested or profiler.sampled():
+        g.profile = profiler.start()
+
+def finish_profiling(status: int):
+    session = g.pop('profile', None)
+    if session is None:
+        return None
+    return profiler.finish(session, {
+        'route': request.url_rule.rule if request.url_rule is not None else request.path,
+        'path': request.full_path.rstrip('?'),
+        'method': request.method,
+        'status': status,
+        'user': current_user.email if current_user.is_authenticated else None
+    })
+
+@app.after_request
+def stop_profiling(response):
+    name = finish_profiling(response.status_code)
+    if name:
+        response.headers['X-Profile-Id'] = name
+    return response
+
+@app.teardown_request
+def abandon_profiling(error=None):
+    # after_request does not run when a view raises
+    if 'profile' in g:
+        finish_profiling(500)
+
 # Attempt database connection and table creation
 def init_db():
     try:
@@ -83,12 +306,38 @@ DEFAULT_NAMESPACES = ["hashicorp", "terraform-aws-modules", "terraform-google-mo
 DEFAULT_PROVIDERS = ["aws", "azure", "gcp", "kubernetes"]
 
 class TerraformModuleClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    """Synchronous registry backend client.
+
+    The module-level `client` carries no credentials and owns the shared
+    transport and caches; requests use `bind` (see `backend()`) to get a
+    view authenticated as the current user, so threads never share a token.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        transport: Optional[BackendTransport] = None,
+        coalescer: Optional[SingleFlight] = None,
+        validator_cache: Optional[TTLCache] = None
+    ):
         self.base_url = base_url.rstrip('/')
         self.token = None
+        self.transport = transport or BackendTransport()
+        self.coalescer = coalescer or SingleFlight()
+        # endpoint -> (etag, last_modified, body) for conditional revalidation
+        if validator_cache is None:
+            validator_cache = TTLCache(ttl=3600, max_entries=4096, name='versions_cache')
+        self.validator_cache = validator_cache
+        self.revalidated = 0
+        self.refetched = 0
+        # Bound views created by `bind` point back at the instance owning the counters
+        self._root = self
 
-    def set_jwt_token(self, token: str):
-        self.token = token
+    def bind(self, token: Optional[str]) -> 'TerraformModuleClient':
+        """Return a view of this client that authenticates with token"""
+        bound = copy.copy(self)
+        bound.token = token
+        return bound
 
     def get_headers(self) -> Dict[str, str]:
         headers = {'Content-Type': 'application/json'}
@@ -96,6 +345,81 @@ class TerraformModuleClient:
             headers['Authorization'] = f'Bearer {self.token}'
         return headers
 
+    def _auth_scope(self) -> Optional[str]:
+        """Identify the credentials a request is made with without exposing the token"""
+        if not self.token:
+            return None
+        return hashlib.sha256(self.token.encode('utf-8')).hexdigest()[:16]
+
+    def _make_request(self, method: str, endpoint: str, conditional: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        """Send a request to the backend, sharing identical in-flight GETs"""
+        if method.upper() != 'GET':
+            return self._send(method, endpoint, **kwargs)
+        send = self._send_conditional if conditional else self._send
+
+        params = kwargs.get('params') or {}
+        key = (
+            method.upper(),
+            endpoint,
+            tuple(sorted((k, str(v)) for k, v in params.items())),
+            self._auth_scope()
+        )
+        return self.coalescer.do(key, lambda: send(method, endpoint, **kwargs))
+
+    def _send(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """Send a request to the backend over the shared connection pool"""
+        response = self.transport.request(
+            method,
+            f"{self.base_url}/{endpoint.lstrip('/')}",
+            headers=self.get_headers(),
+            **kwargs
+        )
+        response.raise_for_status()
+        if response.status_code == 204:
+            # Download endpoints answer 204 with the location in X-Terraform-Get
+            terraform_get = response.headers.get('X-Terraform-Get')
+            return {'download_url': terraform_get} if terraform_get else None
+        return response.json()
+
+    def _send_conditional(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """GET that revalidates a cached body with the backend's ETag/Last-Modified"""
+        headers = self.get_headers()
+        cached = self.validator_cache.get(endpoint)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = self.transport.request(
+            method,
+            f"{self.base_url}/{endpoint.lstrip('/')}",
+            headers=headers,
+            **kwargs
+        )
+        if response.status_code == 304 and cached:
+            self._root.revalidated += 1
+            # Keep the entry alive, picking up any rotated validators
+            self.validator_cache.set(endpoint, (
+                response.headers.get('ETag', cached[0]),
+                response.headers.get('Last-Modified', cached[1]),
+                cached[2]
+            ))
+            return cached[2]
+
+        response.raise_for_status()
+        self._root.refetched += 1
+        body = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.validator_cache.set(endpoint, (etag, last_modified, body))
+        return body
+
+    @timed('search_modules')
+    @traced('backend.search_modules')
+    @guarded('search_modules')
     def search_modules(
         self,
         query: str = "",
@@ -113,87 +437,338 @@ class TerraformModuleClient:
             params['provider'] = provider
         if namespace:
             params['namespace'] = namespace
-            
-        response = requests.get(
-            f"{self.base_url}/v1/modules/search",
-            params=params,
-            headers=self.get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
 
-    def get_module_versions(self, namespace: str, name: str, provider: str) -> Dict[str, Any]:
-        response = requests.get(
-            f"{self.base_url}/v1/modules/{namespace}/{name}/{provider}/versions",
-            headers=self.get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._make_request('GET', '/v1/modules/search', params=params)
 
+    @timed('list_versions')
+    @traced('backend.list_versions')
+    @guarded('list_versions', fallback=lambda api, *module: api.cached_versions(*module))
+    def list_versions(self, namespace: str, name: str, provider: str) -> Dict[str, Any]:
+        return self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/versions', conditional=True)
+
+    def cached_versions(self, namespace: str, name: str, provider: str) -> Optional[Dict[str, Any]]:
+        """The last /versions document seen for a module, for when the backend cannot be asked"""
+        cached = self.validator_cache.get(f'/v1/modules/{namespace}/{name}/{provider}/versions')
+        return cached[2] if cached else None
+
+    # Kept for callers written against the original client
+    get_module_versions = list_versions
+
+    @timed('get_module_details')
+    @traced('backend.get_module_details')
+    @guarded('get_module_details')
     def get_module_details(self, namespace: str, name: str, provider: str, version: str) -> Dict[str, Any]:
-        response = requests.get(
-            f"{self.base_url}/v1/modules/{namespace}/{name}/{provider}/{version}",
-            headers=self.get_headers()
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}')
+
+    @timed('get_module_dependencies')
+    @traced('backend.get_module_dependencies')
+    @guarded('get_module_dependencies')
+    def get_module_dependencies(self, namespace: str, name: str, provider: str, version: str) -> Dict[str, Any]:
+        return self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}/dependencies')
+
+    @timed('get_module_stats')
+    @traced('backend.get_module_stats')
+    @guarded('get_module_stats')
+    def get_module_stats(self, namespace: str, name: str, provider: str) -> Dict[str, Any]:
+        return self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/stats')
+
+    @timed('get_download_url')
+    @traced('backend.get_download_url')
+    @guarded('get_download_url')
+    def get_download_url(self, namespace: str, name: str, provider: str, version: str) -> Optional[Dict[str, Any]]:
+        return self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}/download')
+
+    @timed('get_module_source')
+    @traced('backend.get_module_source')
+    @guarded('get_module_source')
+    def get_module_source(self, namespace: str, name: str, provider: str, version: str) -> Optional[Dict[str, Any]]:
+        return self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}/source')
+
+# Initialize the shared transport and the client
+transport = BackendTransport.from_config(app.config)
+client = TerraformModuleClient(
+    base_url=app.config['BACKEND_URL'],
+    transport=transport,
+    validator_cache=TTLCache(
+        ttl=app.config['VERSIONS_CACHE_TTL'],
+        max_entries=app.config['VERSIONS_CACHE_MAX_ENTRIES'],
+        max_bytes=app.config['VERSIONS_CACHE_MAX_BYTES'],
+        sizeof=lambda entry: json_size(entry[2]),
+        name='versions_cache'
+    )
+)
+def backend() -> TerraformModuleClient:
+    """The backend client for this request, authenticated as the current user.
+
+    Resolve it in the request thread and hand it to executor work
+    explicitly; `g` is not available in worker threads.
+    """
+    if 'backend_client' not in g:
+        g.backend_client = client.bind(current_user.token if current_user.is_authenticated else None)
+    return g.backend_client
+
+def backend_unavailable(error: Exception):
+    """503 for a backend that is down, too slow for the deadline or fenced off by its circuit breaker"""
+    detail = str(error) or type(error).__name__
+    logger.warning(f"Backend unavailable for {request.path}: {detail}")
+    retry_after = getattr(error, 'retry_after', None) or app.config['CIRCUIT_RESET_TIMEOUT']
+    response = jsonify({"error": "Registry backend unavailable, please retry later", "detail": detail})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(int(retry_after), 1))
+    return response
+
+token_cache = TokenVerificationCache(
+    ttl=app.config['TOKEN_VERIFY_TTL'],
+    expiry_margin=app.config['TOKEN_EXPIRY_MARGIN']
+)
+# Unfiltered backend search results; the namespace filter is applied per user on the way out
+search_cache = TTLCache(
+    ttl=app.config['SEARCH_CACHE_TTL'],
+    stale_ttl=app.config['SEARCH_CACHE_STALE_TTL'],
+    max_entries=app.config['SEARCH_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['SEARCH_CACHE_MAX_BYTES'],
+    name='search_cache'
+)
+# A published namespace/name/provider/version never changes, so its download URL can live long
+download_cache = TTLCache(
+    ttl=app.config['DOWNLOAD_CACHE_TTL'],
+    max_entries=app.config['DOWNLOAD_CACHE_MAX_ENTRIES'],
+    name='download_cache'
+)
 
-# Initialize the client
-client = TerraformModuleClient(base_url=app.config['BACKEND_URL'])
+# Shared, bounded pool for fanning out independent backend calls
+backend_executor = ContextExecutor(
+    max_workers=app.config['BACKEND_FANOUT_WORKERS'],
+    thread_name_prefix='backend-fanout'
+)
+
+# Prefix index for autocomplete, fed by registered repositories and every search result we see
+typeahead = TypeaheadIndex()
+typeahead_seeded = False
+typeahead_seeder: Optional[threading.Thread] = None
+typeahead_seed_lock = threading.Lock()
+
+def remember_search_results(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Feed backend search results to the typeahead index and pass them through"""
+    if result and result.get('modules'):
+        typeahead.add_many(result['modules'])
+    return result
+
+def repository_module(repo: Repository) -> Dict[str, Any]:
+    """Registry coordinates for a registered repo, following the terraform-<provider>-<name> convention"""
+    match = re.match(r'^terraform-([a-z0-9]+)-(.+)$', repo.name or '')
+    if match:
+        return {'namespace': repo.namespace, 'name': match.group(2), 'provider': match.group(1)}
+    return {'namespace': repo.namespace, 'name': repo.name, 'provider': repo.provider}
+
+def seed_typeahead():
+    """Load every registered repository into the typeahead index"""
+    global typeahead_seeded
+    try:
+        with app.app_context():
+            typeahead.add_many(repository_module(repo) for repo in Repository.query.yield_per(1000))
+        typeahead_seeded = True
+        logger.info(f"Typeahead index seeded with {len(typeahead)} modules")
+    except Exception as e:
+        logger.warning(f"Seeding the typeahead index failed: {str(e)}")
+
+def start_typeahead_seed():
+    """Seed the typeahead index on a background thread unless it is seeded or being seeded"""
+    global typeahead_seeder
+    with typeahead_seed_lock:
+        if typeahead_seeded or (typeahead_seeder is not None and typeahead_seeder.is_alive()):
+            return
+        typeahead_seeder = threading.Thread(target=seed_typeahead, name='typeahead-seed', daemon=True)
+        typeahead_seeder.start()
+
+# Seeded at startup so no request waits for the repository table scan;
+# autocomplete retries if this fails, e.g. before the first migration
+start_typeahead_seed()
+
+# Local search index; None when disabled
+search_index = None
+if app.config['SEARCH_INDEX_ENABLED']:
+    search_index = ModuleSearchIndex(
+        app.config['SEARCH_INDEX_PATH'],
+        max_staleness=app.config['SEARCH_INDEX_MAX_STALENESS']
+    )
+if search_index is not None and app.config['SEARCH_INDEX_SYNC']:
+    # Every worker starts the thread but only the holder of the index's sync lock pages the backend
+    sync_client = client.bind(app.config['BACKEND_SERVICE_TOKEN'])
+    search_index.start_background_sync(
+        lambda offset, limit: (remember_search_results(
+            sync_client.search_modules(limit=limit, offset=offset)
+        ) or {}).get('modules', []),
+        interval=app.config['SEARCH_INDEX_SYNC_INTERVAL']
+    )
+
+# Each part of the module page is cached on its own schedule
+module_part_caches = {
+    part: TTLCache(ttl=app.config[f'MODULE_{part.upper()}_TTL'], max_entries=4096, name=f'module_{part}_cache')
+    for part in ('versions', 'details', 'dependencies', 'stats')
+}
+
+# Parsed version indexes, keyed like the versions part cache
+version_indexes = TTLCache(
+    ttl=app.config['VERSIONS_CACHE_TTL'],
+    max_entries=app.config['VERSIONS_CACHE_MAX_ENTRIES'],
+    name='version_index_cache'
+)
+version_indexes.rebuilds = 0
+
+def invalidate_download_cache(namespace: str, name: str, provider: str, version: Optional[str] = None) -> int:
+    """Forget cached download URLs for a module, or for one of its versions"""
+    return download_cache.invalidate_where(
+        lambda key: key[1:4] == (namespace, name, provider) and (version is None or key[4] == version)
+    )
+
+# user id -> UserSnapshot fields. Writes in this process invalidate their
+# entry; the TTL bounds staleness for changes made by other workers.
+identity_cache = TTLCache(
+    ttl=app.config['IDENTITY_CACHE_TTL'],
+    max_entries=app.config['IDENTITY_CACHE_MAX_ENTRIES'],
+    name='identity_cache'
+)
+
+token_store = create_token_store(app.config)
+
+def invalidate_identity(user_id: int):
+    """Drop a user's cached snapshot after changing their row"""
+    identity_cache.invalidate(int(user_id))
 
 @login_manager.user_loader
+@traced('load_user')
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    fields = identity_cache.get(user_id)
+    current_span = tracer.current()
+    if current_span is not None:
+        current_span.set(cached=fields is not None)
+    if fields is None:
+        user = User.query.get(user_id)
+        if user is None:
+            return None
+        fields = UserSnapshot.fields_of(user)
+        identity_cache.set(user_id, fields)
+    # A fresh object per request, so in-request updates never leak into the cache
+    return UserSnapshot(**fields, token=token_store.get(user_id))
+
+@timed('/auth/verify')
+@traced('/auth/verify')
+@guarded('/auth/verify')
+def auth_verify(token: Optional[str]) -> requests.Response:
+    return transport.get(
+        f"{app.config['BACKEND_URL']}/auth/verify",
+        headers={'Authorization': f'Bearer {token}'} if token else {}
+    )
+
+@timed('/auth/refresh')
+@traced('/auth/refresh')
+@guarded('/auth/refresh')
+def auth_refresh(token: str) -> requests.Response:
+    return transport.post(
+        f"{app.config['BACKEND_URL']}/auth/refresh",
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json'
+        }
+    )
+
+@timed('/auth/token')
+@traced('/auth/token')
+@guarded('/auth/token')
+def auth_token(credentials: Dict[str, Any]) -> requests.Response:
+    return transport.post(
+        f"{app.config['BACKEND_URL']}/auth/token",
+        json=credentials,
+        headers={'Content-Type': 'application/json'}
+    )
+
+@traced('token_refresh')
+def exchange_token(user_id: int, token: str) -> Optional[Dict[str, Any]]:
+    """Trade a token for a new one at /auth/refresh and store it; None if the backend refuses"""
+    response = auth_refresh(token)
+
+    if response.status_code in (401, 403):  # Token completely invalid
+        return None
+
+    response.raise_for_status()
+    token_data = response.json()
+
+    if not token_data.get('token'):
+        return None
+
+    token_cache.forget(token)
+    token_store.set(user_id, token_data['token'])
+    token_cache.remember(token_data['token'])
+    # Only a permission change is worth a database write
+    permissions = token_data.get('permissions')
+    if permissions is not None:
+        with app.app_context(), tracer.span('db.update_permissions'):
+            user = User.query.get(user_id)
+            if user is not None and permissions != user.permissions:
+                user.permissions = permissions
+                db.session.commit()
+                invalidate_identity(user_id)
+    logger.info(f"Token refreshed for user {user_id}")
+    return token_data
+
+token_refresher = TokenRefresher(
+    exchange_token, token_store, backend_executor, refresh_at=app.config['TOKEN_REFRESH_AT']
+)
 
 def refresh_token(current_user):
-    """Helper function to refresh an expired token"""
+    """Helper function to refresh an expired token.
+
+    False means the backend rejected the token. Errors saying the backend
+    is unavailable propagate instead: they say nothing about the token.
+    """
     try:
         if not current_user.token:
             return False
-            
-        response = requests.post(
-            f"{app.config['BACKEND_URL']}/auth/refresh",
-            headers={
-                'Authorization': f'Bearer {current_user.token}',
-                'Content-Type': 'application/json'
-            }
-        )
-        
-        if response.status_code == 401:  # Token completely invalid
-            return False
-            
-        response.raise_for_status()
-        token_data = response.json()
-        
-        if not token_data.get('token'):
+
+        token_data = token_refresher.refresh(current_user.id, current_user.token)
+        if not token_data:
             return False
-            
+
+        # The rest of this request carries on with the new token
         current_user.token = token_data['token']
         current_user.permissions = token_data.get('permissions', current_user.permissions)
-        db.session.commit()
-        client.set_jwt_token(current_user.token)
-        logger.info(f"Token refreshed for user {current_user.email}")
+        g.pop('backend_client', None)
         return True
     except requests.exceptions.RequestException as e:
+        if is_unavailable(e):
+            raise
         logger.error(f"Token refresh failed: {str(e)}")
         return False
 
 @app.before_request
+@traced('check_token')
 def check_token():
     """Check if token needs refresh before each request"""
-    if current_user.is_authenticated and request.endpoint != 'login':
+    if current_user.is_authenticated and request.endpoint not in ('login', 'static'):
+        # Skip the backend round trip while a recent verification is still good
+        if current_user.token and token_cache.is_verified(current_user.token):
+            # Swap the token out before it expires so no request waits on /auth/refresh
+            if token_refresher.is_due(current_user.token):
+                token_refresher.refresh_in_background(current_user.id, current_user.token)
+            return
         try:
-            response = requests.get(
-                f"{app.config['BACKEND_URL']}/auth/verify",
-                headers={'Authorization': f'Bearer {current_user.token}'} if current_user.token else {}
-            )
-            if response.status_code == 401:  # Token expired
+            response = auth_verify(current_user.token)
+            if response.ok and current_user.token:
+                token_cache.remember(current_user.token)
+            elif response.status_code == 401:  # Token expired
+                if current_user.token:
+                    token_cache.forget(current_user.token)
                 if not refresh_token(current_user):
+                    token_store.delete(current_user.id)
                     logout_user()
                     flash('Your session has expired. Please log in again.', 'info')
                     return redirect(url_for('login'))
-        except requests.exceptions.RequestException:
-            pass  # Don't fail on connection issues
+        except requests.exceptions.RequestException as e:
+            # Don't fail on connection issues, in verify or refresh: keep the token and the session
+            logger.warning(f"Token verification skipped, backend unavailable: {str(e)}")
+            resilience.mark_degraded('/auth/verify')
 
 @app.route('/')
 def home():
@@ -213,17 +788,13 @@ def login():
         if user and user.check_password(form.password.data):
             try:
                 # Request token from backend with role-based permissions
-                response = requests.post(
-                    f"{app.config['BACKEND_URL']}/auth/token",
-                    json={
-                        "username": user.email,
-                        "password": form.password.data,
-                        "grant_type": "password",
-                        "scope": " ".join(user.permissions),
-                        "role": user.role
-                    },
-                    headers={'Content-Type': 'application/json'}
-                )
+                response = auth_token({
+                    "username": user.email,
+                    "password": form.password.data,
+                    "grant_type": "password",
+                    "scope": " ".join(user.permissions),
+                    "role": user.role
+                })
                 logger.debug(f"Token request status: {response.status_code}")
                 
                 if response.status_code == 403:
@@ -240,14 +811,15 @@ def login():
                     return render_template('login.html', form=form)
                 
                 # Update permissions from token response if they changed
-                if 'permissions' in token_data:
+                if 'permissions' in token_data and token_data['permissions'] != user.permissions:
                     user.permissions = token_data['permissions']
+                    db.session.commit()
+                    invalidate_identity(user.id)
                     logger.info(f"Updated permissions for user {user.email}: {user.permissions}")
                 
                 # Store token and update client
-                user.token = token_data['token']
-                db.session.commit()
-                client.set_jwt_token(user.token)
+                token_store.set(user.id, token_data['token'])
+                token_cache.remember(token_data['token'])
                 
                 # Complete login
                 login_user(user)
@@ -357,8 +929,14 @@ def register_repo():
         try:
             db.session.add(repo)
             db.session.commit()
+            typeahead.add_many([repository_module(repo)])
             flash('Repository registered successfully.', 'success')
             return redirect(url_for('index'))
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same repository
+            db.session.rollback()
+            flash('This repository has already been registered.', 'warning')
+            return redirect(url_for('index'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error registering repository: {str(e)}', 'danger')
@@ -369,24 +947,59 @@ def register_repo():
 @app.route('/api/repositories')
 @login_required
 def list_repositories():
+    """One page of repositories in the user's namespaces, ordered by id.
+
+    Pages are keyed on the last id seen rather than an offset, so each one
+    is an index range scan however deep the client has paged. With
+    ?stream=true every remaining repository is sent as one chunked response
+    instead, without a page size cap.
+    """
     try:
-        # Get all repositories in namespaces the user has access to
-        repositories = Repository.query.filter(
+        query = Repository.query.filter(
             Repository.namespace.in_(current_user.namespaces or DEFAULT_NAMESPACES)
-        ).all()
-        
-        repos_list = [{
-            'id': repo.id,
-            'url': repo.url,
-            'namespace': repo.namespace,
-            'name': repo.name,
-            'provider': repo.provider,
-            'owner': repo.owner_id,
-            'created_at': repo.created_at.isoformat(),
-            'updated_at': repo.updated_at.isoformat(),
-            'can_edit': repo.owner_id == current_user.id  # Add flag for UI to show edit controls
-        } for repo in repositories]
-        return jsonify({'repositories': repos_list})
+        )
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                query = query.filter(Repository.id > int(decode_cursor(cursor)['id']))
+            except (ValueError, KeyError, TypeError):
+                return jsonify({"error": "Invalid cursor"}), 400
+        query = query.order_by(Repository.id)
+
+        user_id = current_user.id
+
+        def serialize(repo):
+            return {
+                'id': repo.id,
+                'url': repo.url,
+                'namespace': repo.namespace,
+                'name': repo.name,
+                'provider': repo.provider,
+                'owner': repo.owner_id,
+                'created_at': repo.created_at.isoformat(),
+                'updated_at': repo.updated_at.isoformat(),
+                'can_edit': repo.owner_id == user_id  # Add flag for UI to show edit controls
+            }
+
+        if request.args.get('stream') == 'true':
+            chunk_size = app.config['STREAM_CHUNK_SIZE']
+            return streamed_json_list(
+                'repositories', query.yield_per(chunk_size), serialize, chunk_size,
+                trailer=lambda: {'next_cursor': None}
+            )
+
+        limit = min(
+            max(request.args.get('limit', app.config['REPOSITORIES_PAGE_SIZE'], type=int), 1),
+            app.config['REPOSITORIES_MAX_PAGE_SIZE']
+        )
+        # One extra row tells us whether there is a next page
+        repositories = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(repositories) > limit:
+            repositories = repositories[:limit]
+            next_cursor = encode_cursor({'id': repositories[-1].id})
+
+        return jsonify({'repositories': [serialize(repo) for repo in repositories], 'next_cursor': next_cursor})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -399,31 +1012,119 @@ def search_modules():
         namespace = request.args.get('namespace')
         limit = request.args.get('limit', 10, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
 
         # If namespace is specified, verify user has access to it
         if namespace and namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
             return jsonify({"error": "Namespace access denied"}), 403
-        
-        result = client.search_modules(
+
+        cursor_state = {}
+        if cursor:
+            try:
+                cursor_state = decode_cursor(cursor)
+                offset = int(cursor_state['o'])
+            except (ValueError, KeyError, TypeError):
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        accessible_namespaces = current_user.namespaces or DEFAULT_NAMESPACES
+        with tracer.span('search.local_index'):
+            local = local_search_page(query, provider, namespace, accessible_namespaces, limit, offset, cursor_state)
+        if local is not None:
+            return jsonify(local)
+
+        # Over-fetch until the page is full of modules from accessible namespaces
+        filler = new_page_filler(limit, offset, accessible_namespaces)
+        result = {}
+        batch = filler.next_batch()
+        while batch is not None:
+            batch_offset, batch_limit = batch
+            try:
+                result = cached_search(query, provider, namespace, batch_limit, batch_offset)
+            except requests.exceptions.RequestException as e:
+                if not is_unavailable(e):
+                    raise
+                # A stale local index beats no answer while the backend is down
+                local = local_search_page(query, provider, namespace, accessible_namespaces, limit, offset,
+                                          cursor_state, allow_stale=True)
+                if local is None:
+                    return backend_unavailable(e)
+                resilience.mark_degraded('search_modules')
+                return jsonify(local)
+            with tracer.span('search.filter', offset=batch_offset, limit=batch_limit):
+                filler.feed(result.get('modules') or [])
+            batch = filler.next_batch()
+
+        # Copy: the cached document is shared between users
+        result = dict(result)
+        result['modules'] = filler.items
+        result['next_cursor'] = filler.next_cursor()
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error searching modules: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def local_search_page(query: str, provider: Optional[str], namespace: Optional[str], accessible_namespaces,
+                      limit: int, offset: int, cursor_state: Dict[str, Any],
+                      allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+    """Answer a search page from the local index, or None to fall back to the backend.
+
+    Index offsets count accessible modules while backend offsets do not, so
+    a cursor always resumes on the side that issued it. `allow_stale` accepts
+    any synced index, for when the backend cannot answer.
+    """
+    if search_index is None or (cursor_state and cursor_state.get('s') != 'index'):
+        return None
+    if not (search_index.is_fresh() or ((cursor_state or allow_stale) and search_index.last_synced())):
+        return None
+
+    modules = search_index.search(query, accessible_namespaces, provider, namespace, limit + 1, offset)
+    return {
+        'modules': modules[:limit],
+        'next_cursor': encode_cursor({'o': offset + limit, 's': 'index'}) if len(modules) > limit else None
+    }
+
+@traced('search.cached')
+def cached_search(query: str, provider: Optional[str], namespace: Optional[str], limit: int, offset: int) -> Dict[str, Any]:
+    """Unfiltered backend search results, served from the search cache"""
+    api = backend()
+    return search_cache.get_or_load(
+        (query, provider, namespace, limit, offset),
+        lambda: remember_search_results(api.search_modules(
             query=query,
             provider=provider,
             namespace=namespace,
             limit=limit,
             offset=offset
-        )
-        
-        # Filter results to only show modules from accessible namespaces
-        if 'modules' in result:
-            accessible_namespaces = current_user.namespaces or DEFAULT_NAMESPACES
-            result['modules'] = [
-                module for module in result['modules']
-                if module.get('namespace') in accessible_namespaces
-            ]
-            
-        return jsonify(result)
-    except Exception as e:
-        logger.error(f"Error searching modules: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        ))
+    )
+
+def new_page_filler(limit: int, offset: int, accessible_namespaces) -> PageFiller:
+    return PageFiller(
+        limit=limit,
+        offset=offset,
+        accept=lambda module: module.get('namespace') in accessible_namespaces,
+        max_batches=app.config['SEARCH_MAX_BATCHES'],
+        max_batch_size=app.config['SEARCH_MAX_BATCH_SIZE']
+    )
+
+@app.route('/v1/modules/autocomplete')
+@login_required
+def autocomplete_modules():
+    """Typeahead completions for namespace/name/provider, served from memory.
+
+    Until the background seed finishes, completions cover only modules seen
+    in search results and registrations so far.
+    """
+    if not typeahead_seeded:
+        start_typeahead_seed()
+
+    prefix = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 25)
+    if not prefix.strip():
+        return jsonify({'completions': []})
+    return jsonify({
+        'completions': typeahead.complete(prefix, current_user.namespaces or DEFAULT_NAMESPACES, limit)
+    })
 
 @app.route('/v1/modules/<namespace>/<name>/<provider>/versions')
 @login_required
@@ -433,12 +1134,309 @@ def list_versions(namespace, name, provider):
         if namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
             return jsonify({"error": "Namespace access denied"}), 403
             
-        result = client.list_versions(namespace, name, provider)
-        return jsonify(result)
+        result = backend().list_versions(namespace, name, provider)
+        # Let the browser revalidate repeat expansions and get an empty 304 back
+        response = jsonify(result)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
+        if is_unavailable(e):
+            return backend_unavailable(e)
         logger.error(f"Error listing versions: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/v1/modules/<namespace>/<name>/<provider>/versions/resolve')
+@login_required
+def resolve_version(namespace, name, provider):
+    """Newest version matching a Terraform constraint, e.g. ?constraint=~> 1.2"""
+    try:
+        if namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
+            return jsonify({"error": "Namespace access denied"}), 403
+
+        constraint = request.args.get('constraint', '')
+        index = version_index(namespace, name, provider)
+        try:
+            matches = index.matching(constraint)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not matches:
+            return jsonify({"error": f"No version of {namespace}/{name}/{provider} matches '{constraint}'"}), 404
+
+        result = {'constraint': constraint, 'version': matches[0]}
+        if request.args.get('all') == 'true':
+            result['matches'] = matches
+        return jsonify(result)
+    except Exception as e:
+        if is_unavailable(e):
+            return backend_unavailable(e)
+        logger.error(f"Error resolving version constraint: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def terraform_get_response(kind: str, namespace: str, name: str, provider: str, version: str, fetch) -> Response:
+    """Build the 204 X-Terraform-Get response for a module version, caching the resolved URL"""
+    key = (kind, namespace, name, provider, version)
+    download_url = download_cache.get(key)
+    if download_url is None:
+        result = fetch(namespace, name, provider, version)
+        if result and result.get('download_url'):
+            download_url = result['download_url']
+            download_cache.set(key, download_url)
+
+    response = Response('', 204)
+    if download_url:
+        response.headers.update(terraform_get_headers(download_url))
+        response.make_conditional(request)
+    return response
+
+def terraform_get_headers(download_url: str) -> Dict[str, str]:
+    """Headers for a resolved download URL; published versions are immutable, so let nginx and Terraform reuse them"""
+    visibility = 'public' if app.config['DOWNLOAD_CACHE_PUBLIC'] else 'private'
+    return {
+        'X-Terraform-Get': download_url,
+        'Cache-Control': f"{visibility}, max-age={int(app.config['DOWNLOAD_CACHE_TTL'])}, immutable",
+        'Vary': 'Authorization, Cookie',
+        'ETag': '"%s"' % hashlib.sha256(download_url.encode('utf-8')).hexdigest()[:32]
+    }
+
+def resolve_batch_constraint(api: TerraformModuleClient, namespace: str, name: str, provider: str,
+                             constraint: str) -> Optional[str]:
+    return version_index(namespace, name, provider, api=api).resolve(constraint)
+
+@app.route('/v1/modules/batch', methods=['POST'])
+@login_required
+def batch_modules():
+    """Versions (and optionally version details or a resolved constraint) for many modules in one call"""
+    payload = request.get_json(silent=True) or {}
+    items = payload.get('modules')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Request body must contain a non-empty 'modules' list"}), 400
+    if len(items) > app.config['BATCH_MAX_ITEMS']:
+        return jsonify({"error": f"At most {app.config['BATCH_MAX_ITEMS']} modules per batch"}), 400
+
+    accessible_namespaces = current_user.namespaces or DEFAULT_NAMESPACES
+    api = backend()
+    results = []
+    pending = {}
+    for item in items:
+        if not isinstance(item, dict) or not all(item.get(k) for k in ('namespace', 'name', 'provider')):
+            results.append({'error': "Each module needs 'namespace', 'name' and 'provider'"})
+            continue
+        entry = {k: item[k] for k in ('namespace', 'name', 'provider')}
+        if item.get('version'):
+            entry['version'] = item['version']
+        if item.get('constraint'):
+            entry['constraint'] = item['constraint']
+        results.append(entry)
+        if entry['namespace'] not in accessible_namespaces:
+            entry['error'] = 'Namespace access denied'
+            continue
+
+        # Identical coordinates in one batch share a single backend call
+        versions_key = ('versions', entry['namespace'], entry['name'], entry['provider'])
+        if versions_key not in pending:
+            pending[versions_key] = backend_executor.submit(
+                api.list_versions, entry['namespace'], entry['name'], entry['provider']
+            )
+        if 'version' in entry:
+            details_key = versions_key[1:] + (entry['version'],)
+            if details_key not in pending:
+                pending[details_key] = backend_executor.submit(api.get_module_details, *details_key)
+        if 'constraint' in entry:
+            resolve_key = ('resolved',) + versions_key[1:] + (entry['constraint'],)
+            if resolve_key not in pending:
+                pending[resolve_key] = backend_executor.submit(resolve_batch_constraint, api, *resolve_key[1:])
+
+    for entry in results:
+        if 'error' in entry:
+            continue
+        coordinates = (entry['namespace'], entry['name'], entry['provider'])
+        keys = [('versions', ('versions',) + coordinates)]
+        if 'version' in entry:
+            keys.append(('details', coordinates + (entry['version'],)))
+        if 'constraint' in entry:
+            keys.append(('resolved', ('resolved',) + coordinates + (entry['constraint'],)))
+        for field, key in keys:
+            try:
+                entry[field] = pending[key].result()
+            except Exception as e:
+                logger.error(f"Batch {field} lookup for {'/'.join(coordinates)} failed: {str(e)}")
+                entry.setdefault('errors', {})[field] = str(e)
+
+    return jsonify({'results': results})
+
+def version_strings(versions_doc: Optional[Dict[str, Any]]) -> list:
+    """Flatten a /versions document into its version strings"""
+    modules = (versions_doc or {}).get('modules') or [{}]
+    return [v['version'] for v in modules[0].get('versions', []) if v.get('version')]
+
+def latest_version(versions_doc: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Pick the highest release from a /versions document by semver precedence"""
+    return VersionIndex.from_document(versions_doc).latest()
+
+def version_index(namespace: str, name: str, provider: str, api: Optional[TerraformModuleClient] = None) -> VersionIndex:
+    """Sorted version index of a module, rebuilt only when its /versions document changes"""
+    key = (namespace, name, provider)
+    api = api or backend()
+    document = module_part_caches['versions'].get_or_load(key, lambda: api.list_versions(*key))
+    cached = version_indexes.get(key)
+    # A 304 revalidation hands back the very same document object
+    if cached is not None and cached[0] is document:
+        return cached[2]
+    digest = hashlib.sha1(json.dumps(document, sort_keys=True).encode('utf-8')).hexdigest()
+    if cached is not None and cached[1] == digest:
+        index = cached[2]
+    else:
+        index = VersionIndex.from_document(document)
+        version_indexes.rebuilds += 1
+    version_indexes.set(key, (document, digest, index))
+    return index
+
+def fetch_module_parts(namespace: str, name: str, provider: str, version: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch versions, details, dependencies and stats concurrently within MODULE_PAGE_DEADLINE.
+
+    Parts that fail or miss the deadline are reported in 'errors'; late
+    results still land in their cache for the next request. The deadline
+    never extends past the request's backend budget.
+    """
+    budget = resilience.remaining()
+    page_deadline = app.config['MODULE_PAGE_DEADLINE']
+    deadline = time.monotonic() + (min(page_deadline, budget) if budget is not None else page_deadline)
+    api = backend()
+    parts: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    futures = {}
+
+    def start(part, fetch, *args):
+        cache = module_part_caches[part]
+        cached = cache.get(args)
+        if cached is not None:
+            parts[part] = cached
+            return
+
+        def store(future):
+            if future.exception() is None:
+                cache.set(args, future.result())
+
+        futures[part] = backend_executor.submit(fetch, *args)
+        futures[part].add_done_callback(store)
+
+    def collect(*names):
+        selected = {part: futures.pop(part) for part in (names or list(futures)) if part in futures}
+        wait(selected.values(), timeout=max(deadline - time.monotonic(), 0))
+        for part, future in selected.items():
+            if not future.done():
+                errors[part] = 'Timed out'
+                continue
+            try:
+                parts[part] = future.result()
+            except Exception as e:
+                errors[part] = str(e)
+
+    start('versions', api.list_versions, namespace, name, provider)
+    start('stats', api.get_module_stats, namespace, name, provider)
+    if version is None:
+        # Details and dependencies are per version, so the latest one has to be known first
+        collect('versions')
+        version = latest_version(parts.get('versions'))
+    if version:
+        start('details', api.get_module_details, namespace, name, provider, version)
+        start('dependencies', api.get_module_dependencies, namespace, name, provider, version)
+    collect()
+
+    return {
+        'namespace': namespace,
+        'name': name,
+        'provider': provider,
+        'version': version,
+        'details': parts.get('details'),
+        'versions': version_strings(parts.get('versions')),
+        'dependencies': (parts.get('dependencies') or {}).get('dependencies', []),
+        'stats': parts.get('stats'),
+        'errors': errors
+    }
+
+def cached_dependencies(namespace: str, name: str, provider: str, version: str,
+                        api: Optional[TerraformModuleClient] = None) -> Dict[str, Any]:
+    """Direct dependencies of a published version; immutable, so shared with the module page cache"""
+    key = (namespace, name, provider, version)
+    api = api or backend()
+    return module_part_caches['dependencies'].get_or_load(key, lambda: api.get_module_dependencies(*key))
+
+def resolve_constraint(namespace: str, name: str, provider: str, constraint: str,
+                       api: Optional[TerraformModuleClient] = None) -> Optional[str]:
+    """Pin a version constraint to the newest matching version, None if nothing matches"""
+    try:
+        return version_index(namespace, name, provider, api=api).resolve(constraint)
+    except ValueError as e:
+        logger.warning(f"Cannot resolve {namespace}/{name}/{provider} {constraint}: {str(e)}")
+        return None
+
+def dependency_resolver(api: TerraformModuleClient) -> DependencyResolver:
+    """A resolver whose backend calls, made on executor threads, use the given client"""
+    return DependencyResolver(
+        fetch_direct=lambda *module: cached_dependencies(*module, api=api),
+        resolve_version=lambda *module: resolve_constraint(*module, api=api),
+        executor=backend_executor,
+        max_nodes=app.config['DEPENDENCY_MAX_NODES']
+    )
+
+@app.route('/api/modules/<namespace>/<name>/<provider>/<version>/dependency-graph')
+@login_required
+def dependency_graph(namespace, name, provider, version):
+    """Transitive dependency closure of a module version as an adjacency list"""
+    try:
+        accessible_namespaces = current_user.namespaces or DEFAULT_NAMESPACES
+        if namespace not in accessible_namespaces:
+            return jsonify({"error": "Namespace access denied"}), 403
+
+        # Dependencies outside the caller's namespaces are listed with their constraint only: not pinned, not expanded
+        return jsonify(dependency_resolver(backend()).resolve(
+            namespace, name, provider, version,
+            can_expand=lambda dependency_namespace: dependency_namespace in accessible_namespaces
+        ))
+    except Exception as e:
+        logger.error(f"Error resolving dependency graph: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/modules/<namespace>/<name>/<provider>')
+@app.route('/modules/<namespace>/<name>/<provider>/<version>')
+@login_required
+def module_page(namespace, name, provider, version=None):
+    if namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
+        flash(f'You do not have access to the {namespace} namespace.', 'danger')
+        return redirect(url_for('index'))
+
+    module = fetch_module_parts(namespace, name, provider, version)
+    details = dict(
+        {'namespace': namespace, 'name': name, 'provider': provider, 'version': module['version']},
+        **(module['details'] or {})
+    )
+    return render_template(
+        'module.html',
+        details=details,
+        versions=module['versions'],
+        readme=details.get('readme', ''),
+        tags=details.get('tags', []),
+        dependencies=module['dependencies'],
+        stats=module['stats'] or {},
+        errors=module['errors']
+    )
+
+@app.route('/api/modules/<namespace>/<name>/<provider>')
+@app.route('/api/modules/<namespace>/<name>/<provider>/<version>')
+@login_required
+def module_detail(namespace, name, provider, version=None):
+    """JSON form of the module page; partial results carry an 'errors' map"""
+    try:
+        if namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
+            return jsonify({"error": "Namespace access denied"}), 403
+
+        return jsonify(fetch_module_parts(namespace, name, provider, version))
+    except Exception as e:
+        logger.error(f"Error building module detail: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/v1/modules/<namespace>/<name>/<provider>/<version>/download')
 @login_required
 def download_module(namespace, name, provider, version):
@@ -446,13 +1444,11 @@ def download_module(namespace, name, provider, version):
         # Verify user has access to this namespace
         if namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
             return jsonify({"error": "Namespace access denied"}), 403
-            
-        result = client.get_download_url(namespace, name, provider, version)
-        response = Response('', 204)
-        if result and 'download_url' in result:
-            response.headers['X-Terraform-Get'] = result['download_url']
-        return response
+
+        return terraform_get_response('download', namespace, name, provider, version, backend().get_download_url)
     except Exception as e:
+        if is_unavailable(e):
+            return backend_unavailable(e)
         logger.error(f"Error getting download URL: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
@@ -463,16 +1459,26 @@ def get_module_source(namespace, name, provider, version):
         # Verify user has access to this namespace
         if namespace not in (current_user.namespaces or DEFAULT_NAMESPACES):
             return jsonify({"error": "Namespace access denied"}), 403
-            
-        result = client.get_module_source(namespace, name, provider, version)
-        response = Response('', 204)
-        if result and 'download_url' in result:
-            response.headers['X-Terraform-Get'] = result['download_url']
-        return response
+
+        return terraform_get_response('source', namespace, name, provider, version, backend().get_module_source)
     except Exception as e:
+        if is_unavailable(e):
+            return backend_unavailable(e)
         logger.error(f"Error getting module source: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/admin/cache/modules/<namespace>/<name>/<provider>', methods=['DELETE'])
+@app.route('/admin/cache/modules/<namespace>/<name>/<provider>/<version>', methods=['DELETE'])
+@login_required
+def admin_invalidate_download_cache(namespace, name, provider, version=None):
+    """Drop cached download URLs, e.g. after a version is re-published or deleted"""
+    if current_user.role != 'admin':
+        return jsonify({"error": "Admin privileges required"}), 403
+
+    removed = invalidate_download_cache(namespace, name, provider, version)
+    logger.info(f"Invalidated {removed} cached download URLs for {namespace}/{name}/{provider}/{version or '*'}")
+    return jsonify({'invalidated': removed})
+
 @app.route('/admin/users')
 @login_required
 def admin_users():
@@ -481,8 +1487,25 @@ def admin_users():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('index'))
         
-    users = User.query.all()
-    return render_template('admin/users.html', users=users)
+    # The session is saved before the body streams, so create the page's CSRF token now
+    generate_csrf()
+    # Rows are fetched and rendered in batches as the page streams out;
+    # stream_template already keeps the request context for the generator
+    users = User.query.order_by(User.id).yield_per(app.config['STREAM_CHUNK_SIZE'])
+    return Response(stream_template('admin/users.html', users=users))
+
+@app.route('/api/admin/users')
+@login_required
+def api_admin_users():
+    """All users as a chunked JSON stream"""
+    if current_user.role != 'admin':
+        return jsonify({"error": "Admin privileges required"}), 403
+
+    chunk_size = app.config['STREAM_CHUNK_SIZE']
+    return streamed_json_list(
+        'users', User.query.order_by(User.id).yield_per(chunk_size),
+        lambda user: dict(user.to_dict(), role=user.role), chunk_size
+    )
 
 @app.route('/admin/users/<int:user_id>', methods=['GET', 'POST'])
 @login_required
@@ -501,6 +1524,7 @@ def admin_edit_user(user_id):
         user.namespaces = [n.strip() for n in form.namespaces.data.split(',') if n.strip()]
         
         db.session.commit()
+        invalidate_identity(user.id)
         flash(f'User {user.email} updated successfully.', 'success')
         return redirect(url_for('admin_users'))
         
@@ -511,6 +1535,110 @@ def admin_edit_user(user_id):
         
     return render_template('admin/edit_user.html', form=form, user=user)
 
+@app.route('/admin/profiles')
+@login_required
+def admin_profiles():
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+
+    return render_template('admin/profiles.html', profiles=profiler.summaries(), profiler=profiler)
+
+@app.route('/admin/profiles/<name>')
+@login_required
+def admin_profile(name):
+    """A stored profile: call tree as text, or ?format=prof for the pstats file"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('index'))
+
+    if request.args.get('format') == 'prof':
+        path = profiler.profile_path(name)
+        if path is None:
+            abort(404)
+        return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=f"{name}.prof")
+
+    summary = profiler.summary(name)
+    if summary is None:
+        abort(404)
+    return Response(summary['call_tree'], mimetype='text/plain')
+
+@app.route('/admin/stats')
+@login_required
+def admin_stats():
+    """Runtime statistics for the backend connection pool and caches"""
+    if current_user.role != 'admin':
+        return jsonify({"error": "Admin privileges required"}), 403
+
+    return jsonify({
+        'backend_pool': transport.stats(),
+        'token_cache': token_cache.stats(),
+        'identity_cache': identity_cache.stats(),
+        'token_store': token_store.stats(),
+        'token_refresh': token_refresher.stats(),
+        'circuit_breakers': breakers.stats(),
+        'search_cache': search_cache.stats(),
+        'coalescing': client.coalescer.stats(),
+        'download_cache': download_cache.stats(),
+        'module_caches': {part: cache.stats() for part, cache in module_part_caches.items()},
+        'search_index': search_index.stats() if search_index is not None else {'enabled': False},
+        'typeahead': typeahead.stats(),
+        'version_indexes': dict(version_indexes.stats(), rebuilds=version_indexes.rebuilds),
+        'versions_cache': dict(
+            client.validator_cache.stats(),
+            revalidated=client.revalidated,
+            refetched=client.refetched
+        )
+    })
+
+registry.register_collector(cache_collector(lambda: dict(
+    {
+        'search': search_cache,
+        'download': download_cache,
+        'versions_validators': client.validator_cache,
+        'version_indexes': version_indexes,
+        'identity': identity_cache,
+        'token_verification': token_cache
+    },
+    **{f'module_{part}': cache for part, cache in module_part_caches.items()}
+)))
+
+@registry.register_collector
+def backend_pool_metrics():
+    stats = transport.stats()
+    coalescing = client.coalescer.stats()
+    return [
+        ('registry_backend_requests_total', 'counter', 'Requests sent over the backend pool', [({}, stats['requests'])]),
+        ('registry_backend_errors_total', 'counter', 'Backend requests that failed at the transport level', [({}, stats['errors'])]),
+        ('registry_backend_connections_opened_total', 'counter', 'Connections opened per backend host',
+         [({'pool': pool}, info['connections_opened']) for pool, info in stats['pools'].items()]),
+        ('registry_backend_coalesced_total', 'counter', 'Backend GETs answered by an identical in-flight call',
+         [({}, coalescing['coalesced'])])
+    ]
+
+CIRCUIT_STATES = {'closed': 0, 'half_open': 1, 'open': 2}
+
+@registry.register_collector
+def circuit_breaker_metrics():
+    circuits = breakers.stats()
+    return [
+        ('registry_circuit_state', 'gauge', 'Backend circuit per endpoint: 0 closed, 1 half-open, 2 open',
+         [({'endpoint': name}, CIRCUIT_STATES[info['state']]) for name, info in circuits.items()]),
+        ('registry_circuit_opened_total', 'counter', 'Times the circuit for an endpoint opened',
+         [({'endpoint': name}, info['opened']) for name, info in circuits.items()]),
+        ('registry_circuit_rejected_total', 'counter', 'Backend calls failed fast by an open circuit',
+         [({'endpoint': name}, info['rejected']) for name, info in circuits.items()])
+    ]
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, backend, database and cache metrics"""
+    token = app.config['METRICS_TOKEN']
+    authorized = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not (current_user.is_authenticated and current_user.role == 'admin'):
+        return jsonify({"error": "Metrics require an admin session or the metrics token"}), 403
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(CSRFError)
 def handle_csrf_error(e):
     flash('The form session has expired. Please try again.', 'danger')
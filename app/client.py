@@ -1,8 +1,23 @@
+from typing import Dict, Any, Optional
+import logging
+
+import requests
+
+from transport import BackendTransport
+
+logger = logging.getLogger(__name__)
+
+
+class TerraformModuleClientError(Exception):
+    """Raised when a registry backend call fails"""
+
+
 class TerraformModuleClient:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", transport: Optional[BackendTransport] = None):
         self.base_url = base_url.rstrip('/')
         self.token = None
         self.verify_ssl = True
+        self.transport = transport or BackendTransport(verify_ssl=self.verify_ssl)
         self.headers = {'Content-Type': 'application/json'}
 
     def set_jwt_token(self, token: str):
@@ -45,7 +60,7 @@ class TerraformModuleClient:
                 safe_headers['Authorization'] = 'Bearer [REDACTED]'
             logger.debug(f"Request headers: {safe_headers}")
             
-            response = requests.request(method, url, headers=self.get_headers(), verify=self.verify_ssl, **kwargs)
+            response = self.transport.request(method, url, headers=self.get_headers(), verify=self.verify_ssl, **kwargs)
             logger.debug(f"Response status: {response.status_code}")
             
             response.raise_for_status()
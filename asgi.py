@@ -0,0 +1,289 @@
+"""ASGI entry point.
+
+Serves the registry proxy routes (search, versions, download, source) as
+native async views on the shared AsyncTerraformModuleClient, so one process
+can keep hundreds of backend calls in flight. Every other request, and any
+proxy request that needs the full Flask flow (no session, unverified or
+expiring token), is handed to the Flask app through asgiref's WSGI adapter.
+
+Run with:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+from http.cookies import SimpleCookie
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+import asyncio
+import logging
+import re
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.http import generate_etag, parse_etags
+
+from app import (
+    app, client, load_user, token_cache, search_cache, download_cache,
+    terraform_get_headers, new_page_filler, local_search_page, remember_search_results,
+    DEFAULT_NAMESPACES
+)
+from pagination import decode_cursor
+from async_client import AsyncTerraformModuleClient
+from metrics import begin_statement_count, end_statement_count, REQUEST_SECONDS, DB_QUERIES
+import resilience
+from resilience import is_unavailable
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+wsgi_application = WsgiToAsgi(app)
+async_client = AsyncTerraformModuleClient.from_config(app.config, validator_cache=client.validator_cache)
+
+SEARCH_PATH = re.compile(r'^/v1/modules/search$')
+VERSIONS_PATH = re.compile(r'^/v1/modules/(?P<namespace>[^/]+)/(?P<name>[^/]+)/(?P<provider>[^/]+)/versions$')
+TERRAFORM_GET_PATH = re.compile(
+    r'^/v1/modules/(?P<namespace>[^/]+)/(?P<name>[^/]+)/(?P<provider>[^/]+)/(?P<version>[^/]+)/(?P<kind>download|source)$'
+)
+
+Result = Tuple[int, Dict[str, str], bytes]
+
+
+def _json(status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> Result:
+    # The same bytes jsonify produces, so ETags match whichever path served the resource
+    body = app.json.response(payload).get_data()
+    return status, dict(headers or {}, **{'Content-Type': 'application/json'}), body
+
+
+def _unavailable(error: Exception) -> Result:
+    retry_after = getattr(error, 'retry_after', None) or app.config['CIRCUIT_RESET_TIMEOUT']
+    detail = str(error) or type(error).__name__
+    return _json(503, {"error": "Registry backend unavailable, please retry later", "detail": detail},
+                 {'Retry-After': str(max(int(retry_after), 1))})
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _load_identity(user_id: str) -> Optional[Dict[str, Any]]:
+    """Load what the proxy routes need about a user; runs in a worker thread"""
+    with app.app_context():
+        user = load_user(user_id)
+        if user is None:
+            return None
+        return {'token': user.token, 'namespaces': user.namespaces or DEFAULT_NAMESPACES}
+
+
+async def authenticate(scope) -> Optional[Dict[str, Any]]:
+    """Resolve the Flask session cookie to a user with a recently verified token.
+
+    Returns None whenever the request should go through the Flask app instead.
+    """
+    cookie_header = _header(scope, b'cookie')
+    if not cookie_header:
+        return None
+    morsel = SimpleCookie(cookie_header).get(app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return None
+
+    serializer = app.session_interface.get_signing_serializer(app)
+    try:
+        session = serializer.loads(
+            morsel.value,
+            max_age=int(app.permanent_session_lifetime.total_seconds())
+        )
+    except Exception:
+        return None
+    user_id = session.get('_user_id')
+    if not user_id:
+        return None
+
+    identity = await asyncio.to_thread(_load_identity, user_id)
+    # Expired or unverified tokens need check_token's refresh flow
+    if identity is None or not identity['token'] or not token_cache.is_verified(identity['token']):
+        return None
+    return identity
+
+
+async def cached_search(backend: AsyncTerraformModuleClient, query, provider, namespace, limit, offset) -> Dict[str, Any]:
+    """Unfiltered backend search results, served from the search cache shared with the Flask app"""
+    async def load():
+        return remember_search_results(await backend.search_modules(
+            query=query,
+            provider=provider,
+            namespace=namespace,
+            limit=limit,
+            offset=offset
+        ))
+
+    return await search_cache.get_or_load_async((query, provider, namespace, limit, offset), load)
+
+
+async def search(scope, identity, backend: AsyncTerraformModuleClient) -> Result:
+    args = {k: v[-1] for k, v in parse_qs(scope['query_string'].decode('latin-1')).items()}
+    query = args.get('query', '')
+    provider = args.get('provider')
+    namespace = args.get('namespace')
+    try:
+        limit = int(args.get('limit', 10))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        limit, offset = 10, 0
+
+    if namespace and namespace not in identity['namespaces']:
+        return _json(403, {"error": "Namespace access denied"})
+
+    cursor_state = {}
+    if args.get('cursor'):
+        try:
+            cursor_state = decode_cursor(args['cursor'])
+            offset = int(cursor_state['o'])
+        except (ValueError, KeyError, TypeError):
+            return _json(400, {"error": "Invalid cursor"})
+
+    local = await asyncio.to_thread(
+        local_search_page, query, provider, namespace, identity['namespaces'], limit, offset, cursor_state
+    )
+    if local is not None:
+        return _json(200, local)
+
+    filler = new_page_filler(limit, offset, identity['namespaces'])
+    result = {}
+    batch = filler.next_batch()
+    while batch is not None:
+        batch_offset, batch_limit = batch
+        try:
+            result = await cached_search(backend, query, provider, namespace, batch_limit, batch_offset)
+        except Exception as e:
+            if not is_unavailable(e):
+                raise
+            # A stale local index beats no answer while the backend is down
+            local = await asyncio.to_thread(
+                local_search_page, query, provider, namespace, identity['namespaces'], limit, offset, cursor_state,
+                allow_stale=True
+            )
+            if local is None:
+                raise
+            resilience.mark_degraded('search_modules')
+            return _json(200, local)
+        filler.feed(result.get('modules') or [])
+        batch = filler.next_batch()
+
+    result = dict(result)
+    result['modules'] = filler.items
+    result['next_cursor'] = filler.next_cursor()
+    return _json(200, result)
+
+
+async def versions(scope, identity, backend: AsyncTerraformModuleClient, namespace, name, provider) -> Result:
+    if namespace not in identity['namespaces']:
+        return _json(403, {"error": "Namespace access denied"})
+
+    status, headers, body = _json(200, await backend.list_versions(namespace, name, provider))
+    etag = generate_etag(body)
+    headers.update({'Cache-Control': 'private, no-cache', 'ETag': f'"{etag}"'})
+    if parse_etags(_header(scope, b'if-none-match')).contains(etag):
+        return 304, headers, b''
+    return status, headers, body
+
+
+async def terraform_get(scope, identity, backend: AsyncTerraformModuleClient, namespace, name, provider, version, kind) -> Result:
+    if namespace not in identity['namespaces']:
+        return _json(403, {"error": "Namespace access denied"})
+
+    key = (kind, namespace, name, provider, version)
+    download_url = download_cache.get(key)
+    if download_url is None:
+        fetch = backend.get_download_url if kind == 'download' else backend.get_module_source
+        result = await fetch(namespace, name, provider, version)
+        if result and result.get('download_url'):
+            download_url = result['download_url']
+            download_cache.set(key, download_url)
+
+    if not download_url:
+        return 204, {}, b''
+    headers = terraform_get_headers(download_url)
+    if parse_etags(_header(scope, b'if-none-match')).contains(headers['ETag'].strip('"')):
+        return 304, headers, b''
+    return 204, headers, b''
+
+
+def route(path: str):
+    """(handler, path parameters, Flask rule the path would match) for a native route, or Nones"""
+    if SEARCH_PATH.match(path):
+        return search, {}, '/v1/modules/search'
+    match = VERSIONS_PATH.match(path)
+    if match:
+        return versions, match.groupdict(), '/v1/modules/<namespace>/<name>/<provider>/versions'
+    match = TERRAFORM_GET_PATH.match(path)
+    if match:
+        return terraform_get, match.groupdict(), f"/v1/modules/<namespace>/<name>/<provider>/<version>/{match['kind']}"
+    return None, None, None
+
+
+async def _send_result(send, result: Result):
+    status, headers, body = result
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        handler, params, rule = route(scope['path'])
+        if handler is not None:
+            # Measured like Flask's before/after_request hooks, authentication included
+            started = time.perf_counter()
+            statements_token = begin_statement_count()
+            identity = await authenticate(scope)
+            if identity is None:
+                end_statement_count(statements_token)
+            else:
+                trace_span = tracer.start(
+                    'request', traceparent=_header(scope, b'traceparent'), method='GET', path=scope['path'], asgi=True
+                )
+                trace_token = tracer.activate(trace_span)
+                budget_token = resilience.begin_request(app.config['BACKEND_REQUEST_BUDGET'])
+                try:
+                    result = await handler(scope, identity, async_client.bind(identity['token']), **params)
+                except Exception as e:
+                    if is_unavailable(e):
+                        logger.warning(f"Backend unavailable for {scope['path']}: {str(e) or type(e).__name__}")
+                        result = _unavailable(e)
+                    else:
+                        logger.error(f"Error serving {scope['path']}: {str(e)}")
+                        result = _json(500, {"error": str(e)})
+                finally:
+                    tracer.deactivate(trace_token)
+                degraded = resilience.degraded()
+                if degraded:
+                    result[1]['X-Degraded'] = ', '.join(degraded)
+                resilience.end_request(budget_token)
+                if trace_span is not None:
+                    trace_span.set(route=rule, status=result[0])
+                    result[1]['X-Trace-Id'] = trace_span.trace_id
+                    tracer.end(trace_span)
+                REQUEST_SECONDS.labels(rule, 'GET', str(result[0])).observe(time.perf_counter() - started)
+                DB_QUERIES.labels(rule).observe(end_statement_count(statements_token))
+                return await _send_result(send, result)
+
+    return await wsgi_application(scope, receive, send)
@@ -0,0 +1,261 @@
+from http.cookiejar import CookieJar
+from typing import Dict, Any, Optional
+import asyncio
+import copy
+import hashlib
+import logging
+import time
+
+import httpx
+
+from cache import TTLCache
+from metrics import timed
+import resilience
+from resilience import guarded
+from tracing import traced, tracer
+from transport import RejectAllCookies
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTerraformModuleClient:
+    """asyncio counterpart of TerraformModuleClient backed by a pooled httpx.AsyncClient.
+
+    One instance owns the connection pool; `bind` returns a view that shares
+    the pool but sends a specific user's token, so concurrent requests never
+    see each other's credentials.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        max_connections: int = 200,
+        max_keepalive_connections: int = 50,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        max_retries: int = 2,
+        call_budget: Optional[float] = 8.0,
+        validator_cache: Optional[TTLCache] = None
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.token = None
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.call_budget = call_budget
+        self.validator_cache = validator_cache
+        self._http: Optional[httpx.AsyncClient] = None
+        self._in_flight: Dict[tuple, asyncio.Future] = {}
+        # Bound views created by `bind` point back at the instance owning the pool
+        self._root = self
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], validator_cache: Optional[TTLCache] = None) -> 'AsyncTerraformModuleClient':
+        return cls(
+            base_url=config['BACKEND_URL'],
+            max_connections=config.get('ASYNC_BACKEND_MAX_CONNECTIONS', 200),
+            max_keepalive_connections=config.get('BACKEND_POOL_MAXSIZE', 50),
+            connect_timeout=config.get('BACKEND_CONNECT_TIMEOUT', 3.05),
+            read_timeout=config.get('BACKEND_READ_TIMEOUT', 10.0),
+            max_retries=config.get('BACKEND_MAX_RETRIES', 2),
+            call_budget=config.get('BACKEND_CALL_BUDGET', 8.0),
+            validator_cache=validator_cache
+        )
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        # Created lazily so the pool belongs to the running event loop
+        if self._http is None:
+            # Shared by every user's requests, so no cookie is kept between them
+            self._http = httpx.AsyncClient(
+                cookies=CookieJar(policy=RejectAllCookies()),
+                timeout=self.timeout,
+                transport=httpx.AsyncHTTPTransport(retries=self.max_retries, limits=self.limits)
+            )
+        return self._http
+
+    def bind(self, token: Optional[str]) -> 'AsyncTerraformModuleClient':
+        """Return a view of this client that authenticates with token"""
+        bound = copy.copy(self)
+        bound.token = token
+        return bound
+
+    def get_headers(self) -> Dict[str, str]:
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        traceparent = tracer.traceparent()
+        if traceparent is not None:
+            headers['traceparent'] = traceparent
+        return headers
+
+    def _auth_scope(self) -> Optional[str]:
+        if not self.token:
+            return None
+        return hashlib.sha256(self.token.encode('utf-8')).hexdigest()[:16]
+
+    async def aclose(self):
+        if self._root._http is not None:
+            await self._root._http.aclose()
+            self._root._http = None
+
+    async def __aenter__(self) -> 'AsyncTerraformModuleClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _make_request(self, method: str, endpoint: str, conditional: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        """Send a request to the backend, sharing identical in-flight GETs"""
+        if method.upper() != 'GET':
+            return await self._send(method, endpoint, **kwargs)
+
+        root = self._root
+        params = kwargs.get('params') or {}
+        key = (
+            endpoint,
+            tuple(sorted((k, str(v)) for k, v in params.items())),
+            self._auth_scope()
+        )
+        pending = root._in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        root._in_flight[key] = future
+        try:
+            send = self._send_conditional if conditional and self.validator_cache is not None else self._send
+            result = await send(method, endpoint, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody waited on is not logged as lost
+            future.exception()
+            raise
+        finally:
+            root._in_flight.pop(key, None)
+
+    async def _request(self, method: str, endpoint: str, headers: Dict[str, str], **kwargs) -> httpx.Response:
+        """Send over the shared pool with timeouts cut to the call's deadline"""
+        with resilience.call_deadline(self.call_budget) as deadline:
+            timeout = self.timeout
+            if deadline is not None:
+                left = max(deadline - time.monotonic(), 0.001)
+                timeout = httpx.Timeout(min(self.timeout.read, left), connect=min(self.timeout.connect, left))
+            return await self._root.http.request(
+                method,
+                f"{self.base_url}/{endpoint.lstrip('/')}",
+                headers=headers,
+                timeout=timeout,
+                **kwargs
+            )
+
+    async def _send(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
+        response = await self._request(method, endpoint, self.get_headers(), **kwargs)
+        response.raise_for_status()
+        if response.status_code == 204:
+            # Download endpoints answer 204 with the location in X-Terraform-Get
+            terraform_get = response.headers.get('X-Terraform-Get')
+            return {'download_url': terraform_get} if terraform_get else None
+        return response.json()
+
+    async def _send_conditional(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """GET that revalidates a cached body with the backend's ETag/Last-Modified"""
+        headers = self.get_headers()
+        cached = self.validator_cache.get(endpoint)
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = await self._request(method, endpoint, headers, **kwargs)
+        if response.status_code == 304 and cached:
+            self.validator_cache.set(endpoint, (
+                response.headers.get('ETag', cached[0]),
+                response.headers.get('Last-Modified', cached[1]),
+                cached[2]
+            ))
+            return cached[2]
+
+        response.raise_for_status()
+        body = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.validator_cache.set(endpoint, (etag, last_modified, body))
+        return body
+
+    @timed('discover_endpoints')
+    @traced('backend.discover_endpoints')
+    @guarded('discover_endpoints')
+    async def discover_endpoints(self) -> Dict[str, Any]:
+        """Registry discovery protocol endpoint"""
+        return await self._make_request('GET', '/.well-known/terraform.json')
+
+    @timed('search_modules')
+    @traced('backend.search_modules')
+    @guarded('search_modules')
+    async def search_modules(
+        self,
+        query: str = "",
+        provider: Optional[str] = None,
+        namespace: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """Search for modules with optional filtering"""
+        params = {
+            'query': query,
+            'limit': limit,
+            'offset': offset
+        }
+        if provider:
+            params['provider'] = provider
+        if namespace:
+            params['namespace'] = namespace
+
+        return await self._make_request('GET', '/v1/modules/search', params=params)
+
+    @timed('list_versions')
+    @traced('backend.list_versions')
+    @guarded('list_versions', fallback=lambda api, *module: api.cached_versions(*module))
+    async def list_versions(self, namespace: str, name: str, provider: str) -> Dict[str, Any]:
+        """List available versions for a module"""
+        return await self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/versions', conditional=True)
+
+    def cached_versions(self, namespace: str, name: str, provider: str) -> Optional[Dict[str, Any]]:
+        """The last /versions document seen for a module, for when the backend cannot be asked"""
+        if self.validator_cache is None:
+            return None
+        cached = self.validator_cache.get(f'/v1/modules/{namespace}/{name}/{provider}/versions')
+        return cached[2] if cached else None
+
+    @timed('get_module_details')
+    @traced('backend.get_module_details')
+    @guarded('get_module_details')
+    async def get_module_details(self, namespace: str, name: str, provider: str, version: str) -> Dict[str, Any]:
+        """Get details for a specific module version"""
+        return await self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}')
+
+    @timed('get_download_url')
+    @traced('backend.get_download_url')
+    @guarded('get_download_url')
+    async def get_download_url(self, namespace: str, name: str, provider: str, version: str) -> Optional[Dict[str, Any]]:
+        """Get download URL for a specific module version"""
+        return await self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}/download')
+
+    @timed('get_module_source')
+    @traced('backend.get_module_source')
+    @guarded('get_module_source')
+    async def get_module_source(self, namespace: str, name: str, provider: str, version: str) -> Optional[Dict[str, Any]]:
+        """Download the module source code"""
+        return await self._make_request('GET', f'/v1/modules/{namespace}/{name}/{provider}/{version}/source')
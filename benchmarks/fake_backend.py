@@ -0,0 +1,274 @@
+"""Stand-in for the registry backend, for benchmarks and local development.
+
+Implements the endpoints documented in references/README.md plus the
+/auth/* calls the frontend makes, over a generated dataset, with a
+configurable per-request latency. Every request is counted per endpoint so
+a benchmark can report how many backend calls each frontend request cost.
+
+    python -m benchmarks.fake_backend --port 8000 --modules 2000 --latency 0.02
+"""
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+
+NAMESPACES = ('hashicorp', 'terraform-aws-modules', 'terraform-google-modules', 'community')
+PROVIDERS = ('aws', 'google', 'azurerm')
+SUBJECTS = ('vpc', 'network', 'cluster', 'bucket', 'database', 'iam', 'dns', 'queue', 'cache', 'gateway')
+
+
+def make_token(ttl: float, **claims) -> str:
+    """An unsigned JWT-shaped token; the frontend only reads its iat/exp claims"""
+    now = time.time()
+    payload = dict(claims, iat=int(now), exp=int(now + ttl))
+    encoded = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+    return f"eyJhbGciOiJub25lIn0.{encoded}.bench"
+
+
+class Dataset:
+    """Deterministic modules, versions and dependencies for a given size and seed"""
+
+    def __init__(self, modules: int = 500, versions: int = 20, seed: int = 1):
+        rng = random.Random(seed)
+        self.modules: List[Dict[str, Any]] = []
+        self.versions: Dict[Tuple[str, str, str], List[str]] = {}
+        for i in range(modules):
+            namespace = NAMESPACES[i % len(NAMESPACES)]
+            provider = PROVIDERS[i % len(PROVIDERS)]
+            name = f"{SUBJECTS[i % len(SUBJECTS)]}-{i}"
+            count = rng.randint(1, versions)
+            module_versions = [f"{1 + v // 10}.{v % 10}.{rng.randint(0, 3)}" for v in range(count)]
+            self.versions[(namespace, name, provider)] = module_versions
+            self.modules.append({
+                'id': f"{namespace}/{name}/{provider}/{module_versions[-1]}",
+                'owner': namespace,
+                'namespace': namespace,
+                'name': name,
+                'version': module_versions[-1],
+                'provider': provider,
+                'description': f"Terraform module managing a {SUBJECTS[i % len(SUBJECTS)]} on {provider}",
+                'source': f"https://github.com/{namespace}/terraform-{provider}-{name}",
+                'published_at': '2024-01-01T00:00:00Z',
+                'downloads': rng.randint(0, 100000),
+                'verified': i % 3 == 0
+            })
+
+    def search(self, query: str, provider: Optional[str], namespace: Optional[str]) -> List[Dict[str, Any]]:
+        query = query.lower()
+        return [
+            module for module in self.modules
+            if (not query or query in module['name'] or query in module['description'].lower())
+            and (not provider or module['provider'] == provider)
+            and (not namespace or module['namespace'] == namespace)
+        ]
+
+    def dependencies(self, namespace: str, name: str, provider: str) -> List[Dict[str, str]]:
+        # Each module depends on up to two modules after it, keeping the graph acyclic
+        index = next((i for i, m in enumerate(self.modules)
+                      if (m['namespace'], m['name'], m['provider']) == (namespace, name, provider)), None)
+        if index is None:
+            return []
+        return [
+            {'source': f"{m['namespace']}/{m['name']}/{m['provider']}", 'version': f"~> {m['version'].rsplit('.', 1)[0]}"}
+            for m in self.modules[index + 1:index + 3]
+        ]
+
+
+class FakeBackend:
+    """The fake registry served on a background thread; `calls` counts requests per endpoint"""
+
+    def __init__(self, dataset: Dataset, latency: float = 0.0, jitter: float = 0.0, token_ttl: float = 3600.0):
+        self.dataset = dataset
+        self.latency = latency
+        self.jitter = jitter
+        self.token_ttl = token_ttl
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.calls)
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> 'FakeBackend':
+        backend = self
+
+        class Handler(_Handler):
+            fake = backend
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='fake-backend', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeBackend
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: Optional[Any] = None, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorized(self) -> bool:
+        return self.headers.get('Authorization', '').startswith('Bearer ')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        parts = url.path.strip('/').split('/')
+        dataset = self.fake.dataset
+
+        if url.path == '/_fake/stats':
+            return self._send(200, self.fake.snapshot())
+        if url.path == '/.well-known/terraform.json':
+            self.fake.count('discovery')
+            return self._send(200, {'modules.v1': '/v1/modules/'})
+
+        if url.path == '/auth/verify':
+            self.fake.count('auth.verify')
+            self.fake.delay()
+            return self._send(200 if self._authorized() else 401, {'valid': self._authorized()})
+
+        if url.path == '/v1/modules/search':
+            self.fake.count('search')
+            self.fake.delay()
+            matches = dataset.search(params.get('q') or params.get('query', ''), params.get('provider'), params.get('namespace'))
+            offset, limit = int(params.get('offset', 0)), int(params.get('limit', 10))
+            return self._send(200, {'modules': matches[offset:offset + limit]})
+
+        if len(parts) < 5 or parts[:2] != ['v1', 'modules']:
+            return self._send(404, {'error': 'Not found'})
+        module = tuple(parts[2:5])
+        versions = dataset.versions.get(module)
+        if versions is None:
+            self.fake.count('not_found')
+            return self._send(404, {'error': 'Module not found'})
+
+        if len(parts) == 6 and parts[5] == 'versions':
+            self.fake.count('versions')
+            self.fake.delay()
+            etag = '"' + hashlib.sha1(','.join(versions).encode()).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, headers={'ETag': etag})
+            body = {'modules': [{'versions': [
+                {'version': v, 'protocols': ['5.0'], 'platforms': [{'os': 'linux', 'arch': 'amd64'}]} for v in versions
+            ]}]}
+            return self._send(200, body, {'ETag': etag})
+
+        if len(parts) == 6 and parts[5] == 'stats':
+            self.fake.count('stats')
+            self.fake.delay()
+            return self._send(200, {'downloads': len(versions) * 100, 'stars': len(versions), 'forks': 1})
+
+        version = parts[5] if len(parts) > 5 else None
+        if version not in versions:
+            self.fake.count('not_found')
+            return self._send(404, {'error': 'Version not found'})
+
+        if len(parts) == 7 and parts[6] in ('download', 'source'):
+            self.fake.count(parts[6])
+            self.fake.delay()
+            namespace, name, provider = module
+            location = f"https://github.com/{namespace}/terraform-{provider}-{name}/archive/v{version}.zip"
+            return self._send(204, headers={'X-Terraform-Get': location})
+
+        if len(parts) == 7 and parts[6] == 'dependencies':
+            self.fake.count('dependencies')
+            self.fake.delay()
+            return self._send(200, {'dependencies': dataset.dependencies(*module)})
+
+        if len(parts) == 6:
+            self.fake.count('details')
+            self.fake.delay()
+            details = next(m for m in dataset.modules if (m['namespace'], m['name'], m['provider']) == module)
+            return self._send(200, dict(details, version=version))
+
+        return self._send(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+
+        if url.path == '/auth/token':
+            self.fake.count('auth.token')
+            self.fake.delay()
+            scope = (body.get('scope') or '').split()
+            token = make_token(self.fake.token_ttl, sub=body.get('username'), role=body.get('role'))
+            return self._send(200, {'token': token, 'permissions': scope})
+
+        if url.path == '/auth/refresh':
+            self.fake.count('auth.refresh')
+            self.fake.delay()
+            if not self._authorized():
+                return self._send(401, {'error': 'Invalid token'})
+            return self._send(200, {'token': make_token(self.fake.token_ttl)})
+
+        if url.path == '/_fake/reset':
+            with self.fake._lock:
+                self.fake.calls.clear()
+            return self._send(200, {})
+
+        return self._send(404, {'error': 'Not found'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--modules', type=int, default=500, help='number of modules in the dataset')
+    parser.add_argument('--versions', type=int, default=20, help='maximum versions per module')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every backend request')
+    parser.add_argument('--jitter', type=float, default=0.0, help='up to this many extra random seconds')
+    parser.add_argument('--token-ttl', type=float, default=3600.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeBackend(Dataset(args.modules, args.versions, args.seed), args.latency, args.jitter, args.token_ttl)
+    fake.start(args.host, args.port)
+    print(f"Fake registry backend on {fake.url} with {args.modules} modules; call counts at {fake.url}/_fake/stats")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
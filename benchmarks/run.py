@@ -0,0 +1,292 @@
+"""Benchmark the frontend against the fake registry backend.
+
+Starts benchmarks.fake_backend and the Flask app in this process (the app
+on a threaded WSGI server with a throwaway SQLite database), then drives
+each scenario over HTTP with a pool of concurrent clients and reports
+latency percentiles, throughput and backend calls per request. Results are
+written as JSON; pass an earlier result to --compare to see the change.
+
+    python -m benchmarks.run --concurrency 16 --requests 1000 --latency 0.02
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from benchmarks.fake_backend import SUBJECTS, Dataset, FakeBackend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ('login', 'search', 'versions', 'download', 'repositories')
+EMAIL = 'bench@example.com'
+PASSWORD = 'bench-password'
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return {'commit': commit or None, 'dirty': dirty}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def start_frontend(backend_url: str, database_url: str):
+    """Import the app against the fake backend and serve it on a free port"""
+    os.environ['BACKEND_URL'] = backend_url
+    os.environ['DATABASE_URL'] = database_url
+    sys.path.insert(0, ROOT)
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import app as frontend
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # The benchmark posts the login form directly
+    frontend.app.config['WTF_CSRF_ENABLED'] = False
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, frontend.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name='frontend', daemon=True).start()
+    return frontend, server
+
+
+def seed_database(frontend, repositories: int, seed: int) -> int:
+    """Create the benchmark user and `repositories` repositories in its namespaces; returns the user id"""
+    rng = random.Random(seed)
+    with frontend.app.app_context():
+        db = frontend.db
+        db.create_all()
+        user = frontend.User(email=EMAIL, role='admin', namespaces=list(frontend.DEFAULT_NAMESPACES))
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+        for i in range(repositories):
+            namespace = rng.choice(frontend.DEFAULT_NAMESPACES)
+            provider = rng.choice(('aws', 'google', 'azurerm'))
+            name = f"terraform-{provider}-bench-{i}"
+            db.session.add(frontend.Repository(
+                url=f"https://github.com/{namespace}/{name}", owner_id=user.id,
+                namespace=namespace, name=name, provider=provider
+            ))
+        db.session.commit()
+        return user.id
+
+
+def login(base_url: str) -> Tuple[requests.Session, requests.Response]:
+    session = requests.Session()
+    response = session.post(f"{base_url}/login", data={'email': EMAIL, 'password': PASSWORD}, allow_redirects=False)
+    return session, response
+
+
+def build_requests(scenario: str, count: int, dataset: Dataset, namespaces, rng: random.Random) -> List[str]:
+    """Paths for one scenario; modules are drawn from the namespaces the benchmark user can see"""
+    visible = [m for m in dataset.modules if m['namespace'] in namespaces]
+    paths = []
+    for _ in range(count):
+        if scenario == 'search':
+            paths.append(f"/v1/modules/search?query={rng.choice(SUBJECTS)}&limit=10&offset={rng.choice((0, 10, 20))}")
+        elif scenario in ('versions', 'download'):
+            module = rng.choice(visible)
+            prefix = f"/v1/modules/{module['namespace']}/{module['name']}/{module['provider']}"
+            if scenario == 'versions':
+                paths.append(f"{prefix}/versions")
+            else:
+                version = rng.choice(dataset.versions[(module['namespace'], module['name'], module['provider'])])
+                paths.append(f"{prefix}/{version}/download")
+        elif scenario == 'repositories':
+            paths.append(f"/api/repositories?limit={rng.choice((20, 50, 100))}")
+        else:
+            paths.append('/login')
+    return paths
+
+
+def run_scenario(scenario: str, paths: List[str], base_url: str, concurrency: int, warmup: int,
+                 fake: FakeBackend) -> Dict[str, Any]:
+    local = threading.local()
+
+    def call(path: str) -> Tuple[float, int, bool]:
+        start = time.perf_counter()
+        if scenario == 'login':
+            session, response = login(base_url)
+            # The login view answers 200 on failure too; a session cookie is what marks success
+            ok = response.status_code < 400 and 'session' in session.cookies
+        else:
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = login(base_url)[0]
+            response = session.get(f"{base_url}{path}", allow_redirects=False)
+            response.content
+            ok = response.status_code < 400
+        return time.perf_counter() - start, response.status_code, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warm up logs every worker in and fills the caches the way a running server would have them
+        list(pool.map(call, paths[:warmup]))
+        before = fake.snapshot()
+        started = time.perf_counter()
+        results = list(pool.map(call, paths[warmup:]))
+        elapsed = time.perf_counter() - started
+        after = fake.snapshot()
+
+    latencies = sorted(seconds * 1000 for seconds, _, _ in results)
+    statuses: Dict[str, int] = {}
+    for _, status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    calls = {endpoint: after.get(endpoint, 0) - before.get(endpoint, 0) for endpoint in after}
+    calls = {endpoint: count for endpoint, count in sorted(calls.items()) if count}
+    measured = len(results)
+    return {
+        'requests': measured,
+        'errors': sum(1 for _, _, ok in results if not ok),
+        'status': statuses,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(measured / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'min': round(latencies[0], 3) if latencies else 0.0,
+            'mean': round(sum(latencies) / measured, 3) if measured else 0.0,
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3) if latencies else 0.0
+        },
+        'backend_calls_per_request': round(sum(calls.values()) / measured, 3) if measured else 0.0,
+        'backend_calls': calls
+    }
+
+
+def print_results(scenarios: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None):
+    def change(current: float, previous: Optional[float]) -> str:
+        if not previous:
+            return ''
+        return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+    columns = ('p50', 'p95', 'p99')
+    print(f"{'scenario':<14}{'reqs':>6}{'errors':>8}" + ''.join(f"{c + ' ms':>22}" for c in columns)
+          + f"{'req/s':>22}{'backend/req':>22}")
+    for name, result in scenarios.items():
+        previous = (baseline or {}).get('scenarios', {}).get(name, {})
+        line = f"{name:<14}{result['requests']:>6}{result['errors']:>8}"
+        for column in columns:
+            value = result['latency_ms'][column]
+            line += f"{f'{value:.1f}' + change(value, previous.get('latency_ms', {}).get(column)):>22}"
+        rps = result['throughput_rps']
+        line += f"{f'{rps:.1f}' + change(rps, previous.get('throughput_rps')):>22}"
+        calls = result['backend_calls_per_request']
+        line += f"{f'{calls:.2f}' + change(calls, previous.get('backend_calls_per_request')):>22}"
+        print(line)
+
+
+def regressions(scenarios: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Scenarios whose p95 latency grew by more than `threshold` percent over the baseline"""
+    found = []
+    for name, result in scenarios.items():
+        previous = baseline.get('scenarios', {}).get(name, {}).get('latency_ms', {}).get('p95')
+        if previous and (result['latency_ms']['p95'] - previous) / previous * 100 > threshold:
+            found.append(f"{name}: p95 {previous:.1f} ms -> {result['latency_ms']['p95']:.1f} ms")
+    return found
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"comma separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--requests', type=int, default=500, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=50, help='unmeasured requests before each scenario')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds the fake backend adds to each call')
+    parser.add_argument('--jitter', type=float, default=0.005, help='up to this many extra random seconds per call')
+    parser.add_argument('--modules', type=int, default=500, help='modules in the fake backend')
+    parser.add_argument('--versions', type=int, default=20, help='maximum versions per module')
+    parser.add_argument('--repositories', type=int, default=1000, help='repositories seeded into the database')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite database')
+    parser.add_argument('--output', help='result file; defaults to benchmarks/results/<time>-<commit>.json')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--fail-on-regression', type=float, metavar='PCT',
+                        help='exit non-zero if any p95 is more than PCT percent above the --compare baseline')
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    dataset = Dataset(args.modules, args.versions, args.seed)
+    fake = FakeBackend(dataset, args.latency, args.jitter).start()
+    workdir = tempfile.mkdtemp(prefix='registry-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    frontend, server = start_frontend(fake.url, database_url)
+    seed_database(frontend, args.repositories, args.seed)
+    base_url = f"http://127.0.0.1:{server.port}"
+
+    rng = random.Random(args.seed)
+    results = {}
+    try:
+        for scenario in scenarios:
+            paths = build_requests(scenario, args.warmup + args.requests, dataset, frontend.DEFAULT_NAMESPACES, rng)
+            results[scenario] = run_scenario(scenario, paths, base_url, args.concurrency, args.warmup, fake)
+    finally:
+        server.shutdown()
+        fake.stop()
+
+    revision = git_revision()
+    document = {
+        'meta': dict(
+            revision,
+            timestamp=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpus=os.cpu_count()
+        ),
+        'config': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'compare', 'fail_on_regression', 'database_url')},
+        'scenarios': results
+    }
+
+    output = args.output
+    if not output:
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{(revision['commit'] or 'unknown')[:8]}.json"
+        output = os.path.join(ROOT, 'benchmarks', 'results', name)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+
+    if baseline is not None and args.fail_on_regression is not None:
+        found = regressions(results, baseline, args.fail_on_regression)
+        for line in found:
+            print(f"Regression: {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
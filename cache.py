@@ -0,0 +1,205 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def json_size(value: Any) -> int:
+    """Approximate the memory footprint of a JSON document by its encoded length"""
+    try:
+        return len(json.dumps(value, separators=(',', ':'), default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL, a memory budget and stale-while-revalidate.
+
+    Entries are fresh for `ttl` seconds. For a further `stale_ttl` seconds
+    `get_or_load` keeps serving the old value while a single background
+    refresh replaces it, so a popular key never blocks on the loader after
+    its first fetch.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 30.0,
+        stale_ttl: float = 0.0,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = json_size,
+        name: str = 'cache'
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.name = name
+        # key -> (value, size, fresh_until, stale_until)
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Hashable, now: float):
+        """Return (value, state) where state is 'fresh', 'stale' or None. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        value, _, fresh_until, stale_until = entry
+        if now < fresh_until:
+            self._entries.move_to_end(key)
+            return value, 'fresh'
+        if now < stale_until:
+            self._entries.move_to_end(key)
+            return value, 'stale'
+        self._remove(key)
+        return None, None
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry[1]
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh value without triggering loads"""
+        with self._lock:
+            value, state = self._lookup(key, time.time())
+            if state == 'fresh':
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            logger.debug(f"{self.name}: value for {key!r} exceeds the cache budget, not caching")
+            return
+        now = time.time()
+        fresh_until = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, fresh_until, fresh_until + self.stale_ttl)
+            self._bytes += size
+            self._evict()
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every key matching predicate, returning how many were removed"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _lookup_for_load(self, key: Hashable):
+        """Look key up on behalf of a loading read.
+
+        Returns (value, state, refresh) where refresh tells the caller it has
+        claimed the background refresh of a stale entry.
+        """
+        with self._lock:
+            value, state = self._lookup(key, time.time())
+            if state == 'fresh':
+                self.hits += 1
+                return value, state, False
+            if state == 'stale':
+                self.stale_hits += 1
+                if key in self._refreshing:
+                    return value, state, False
+                self._refreshing.add(key)
+                return value, state, True
+            self.misses += 1
+            return None, None, False
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling loader on a miss.
+
+        Stale entries are returned immediately and refreshed in the background.
+        """
+        value, state, refresh = self._lookup_for_load(key)
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+        if state is not None:
+            return value
+
+        value = loader()
+        self.set(key, value)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Coroutine variant of get_or_load for async loaders"""
+        value, state, refresh = self._lookup_for_load(key)
+        if refresh:
+            asyncio.ensure_future(self._refresh_async(key, loader))
+        if state is not None:
+            return value
+
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    async def _refresh_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        try:
+            self.set(key, await loader())
+        except Exception as e:
+            logger.warning(f"{self.name}: background refresh of {key!r} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key: Hashable, loader: Callable[[], Any]):
+        try:
+            self.set(key, loader())
+        except Exception as e:
+            # Keep serving the stale value until it ages out
+            logger.warning(f"{self.name}: background refresh of {key!r} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+            }
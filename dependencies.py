@@ -0,0 +1,178 @@
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# namespace/name/provider, optionally prefixed with a registry host
+REGISTRY_SOURCE = re.compile(r'^(?:[\w.-]+\.[\w.-]+(?::\d+)?/)?(?P<namespace>[\w-]+)/(?P<name>[\w-]+)/(?P<provider>[\w-]+)$')
+EXACT_VERSION = re.compile(r'^\s*=?\s*v?(\d+(?:\.\d+)*(?:-[\w.]+)?)\s*$')
+
+Module = Tuple[str, str, str]
+
+
+def parse_registry_source(source: str) -> Optional[Module]:
+    """Return (namespace, name, provider) for a registry address, None for git/local/URL sources"""
+    match = REGISTRY_SOURCE.match(source or '')
+    if not match:
+        return None
+    return match.group('namespace'), match.group('name'), match.group('provider')
+
+
+def node_id(namespace: str, name: str, provider: str, version: str) -> str:
+    return f"{namespace}/{name}/{provider}@{version}"
+
+
+def find_cycles(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """Return one path per back edge found by an iterative depth-first search"""
+    WHITE, GREY, BLACK = 0, 1, 2
+    color = {node: WHITE for node in graph}
+    cycles = []
+    for start in graph:
+        if color[start] != WHITE:
+            continue
+        path = [start]
+        color[start] = GREY
+        stack = [iter(graph[start])]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                color[path.pop()] = BLACK
+                stack.pop()
+                continue
+            state = color.get(child, BLACK)
+            if state == GREY:
+                cycles.append(path[path.index(child):] + [child])
+            elif state == WHITE:
+                color[child] = GREY
+                path.append(child)
+                stack.append(iter(graph[child]))
+    return cycles
+
+
+class DependencyResolver:
+    """Resolve the transitive dependency closure of a module version level by level.
+
+    `fetch_direct(namespace, name, provider, version)` returns the backend's
+    /dependencies document and is expected to be memoized by the caller,
+    since a published version's dependencies never change.
+    `resolve_version(namespace, name, provider, constraint)` turns a
+    non-exact version constraint into a concrete version.
+    """
+
+    def __init__(
+        self,
+        fetch_direct: Callable[[str, str, str, str], Dict[str, Any]],
+        resolve_version: Callable[[str, str, str, str], Optional[str]],
+        executor: Executor,
+        max_nodes: int = 1000
+    ):
+        self.fetch_direct = fetch_direct
+        self.resolve_version = resolve_version
+        self.executor = executor
+        self.max_nodes = max_nodes
+
+    def _children(self, module: Module, version: str,
+                  can_expand: Callable[[str], bool] = lambda namespace: True) -> List[Dict[str, Any]]:
+        """Direct dependencies of one node with their versions pinned.
+
+        Modules in namespaces the caller may not expand keep only their
+        declared constraint: no version is resolved, so nothing about them
+        is looked up on the caller's behalf.
+        """
+        document = self.fetch_direct(*module, version) or {}
+        children = []
+        for dependency in document.get('dependencies', []):
+            source = dependency.get('source', '')
+            constraint = dependency.get('version') or ''
+            coordinates = parse_registry_source(source)
+            if coordinates is None:
+                children.append({'id': source, 'source': source, 'external': True})
+                continue
+            if not can_expand(coordinates[0]):
+                children.append({'id': f"{'/'.join(coordinates)}@{constraint}", 'module': coordinates,
+                                 'constraint': constraint, 'restricted': True})
+                continue
+            exact = EXACT_VERSION.match(constraint)
+            pinned = exact.group(1) if exact else self.resolve_version(*coordinates, constraint)
+            if pinned is None:
+                children.append({'id': f"{'/'.join(coordinates)}@{constraint}", 'source': source,
+                                 'constraint': constraint, 'unresolved': True})
+                continue
+            children.append({
+                'id': node_id(*coordinates, pinned),
+                'module': coordinates,
+                'version': pinned,
+                'constraint': constraint
+            })
+        return children
+
+    def resolve(self, namespace: str, name: str, provider: str, version: str,
+                can_expand: Callable[[str], bool] = lambda namespace: True) -> Dict[str, Any]:
+        root = node_id(namespace, name, provider, version)
+        graph: Dict[str, List[str]] = {}
+        nodes: Dict[str, Dict[str, Any]] = {
+            root: {'namespace': namespace, 'name': name, 'provider': provider, 'version': version}
+        }
+        errors: Dict[str, str] = {}
+        truncated = False
+        frontier: Iterable[Tuple[str, Module, str]] = [(root, (namespace, name, provider), version)]
+
+        while frontier:
+            futures = {
+                node: self.executor.submit(self._children, module, node_version, can_expand)
+                for node, module, node_version in frontier
+            }
+            next_frontier = []
+            for node, future in futures.items():
+                try:
+                    children = future.result()
+                except Exception as e:
+                    logger.warning(f"Resolving dependencies of {node} failed: {str(e)}")
+                    errors[node] = str(e)
+                    graph[node] = []
+                    continue
+
+                graph[node] = [child['id'] for child in children]
+                for child in children:
+                    if child['id'] in nodes:
+                        continue
+                    if len(nodes) >= self.max_nodes:
+                        truncated = True
+                        continue
+                    if 'module' not in child:
+                        nodes[child['id']] = {k: v for k, v in child.items() if k != 'id'}
+                        graph[child['id']] = []
+                        continue
+                    child_namespace, child_name, child_provider = child['module']
+                    if child.get('restricted'):
+                        nodes[child['id']] = {
+                            'namespace': child_namespace,
+                            'name': child_name,
+                            'provider': child_provider,
+                            'constraint': child['constraint'],
+                            'restricted': True
+                        }
+                        graph[child['id']] = []
+                        continue
+                    nodes[child['id']] = {
+                        'namespace': child_namespace,
+                        'name': child_name,
+                        'provider': child_provider,
+                        'version': child['version'],
+                        'constraint': child['constraint']
+                    }
+                    next_frontier.append((child['id'], child['module'], child['version']))
+            frontier = next_frontier
+
+        for node in nodes:
+            graph.setdefault(node, [])
+        return {
+            'root': root,
+            'nodes': nodes,
+            'graph': graph,
+            'cycles': find_cycles(graph),
+            'errors': errors,
+            'truncated': truncated
+        }
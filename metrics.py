@@ -0,0 +1,270 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Recording is meant for hot paths: a labelled child is looked up once per
+label combination and holds preallocated bucket counters, so an observation
+is a bisect plus a few integer/float updates with no lock and no allocation.
+Increments rely on the GIL rather than a lock; under heavy contention a
+sample can occasionally be lost, which is an acceptable trade for metrics.
+Values that already live elsewhere (cache counters, pool stats) are read at
+scrape time through collectors instead of being mirrored on every access.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import threading
+import time
+
+# Seconds; tuned for a proxy whose backend calls take milliseconds to a few seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """Child for one label combination; keep it around instead of calling this per sample"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonic count; the name ends in _total and is used as-is for HELP, TYPE and samples"""
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if not name.endswith('_total'):
+            raise ValueError(f"Counter name {name!r} must end in _total")
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            yield self.name, dict(zip(self.labelnames, values)), child.value
+
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum')
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self.upper_bounds = upper_bounds
+        # One slot per bucket plus the +Inf overflow
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', dict(labels, le=_format_value(bound)), cumulative
+            yield f'{self.name}_count', labels, cumulative
+            yield f'{self.name}_sum', labels, child.sum
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        # collector() -> [(name, type, help, [(labels, value)])]
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable):
+        """Add a function called at scrape time that returns (name, type, help, samples) families"""
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.histogram(
+    'registry_request_duration_seconds', 'Time to produce a response, by route', ('route', 'method', 'status')
+)
+BACKEND_CALL_SECONDS = registry.histogram(
+    'registry_backend_call_duration_seconds', 'Backend call latency as seen by the caller, by operation', ('operation', 'outcome')
+)
+DB_STATEMENTS = registry.counter('registry_db_statements_total', 'SQL statements executed')
+DB_QUERIES = registry.histogram(
+    'registry_db_queries_per_request', 'SQL statements executed per request, by route', ('route',), buckets=COUNT_BUCKETS
+)
+
+# SQL statements of a request served outside Flask (the ASGI fast path); Flask requests count on `g`.
+# A one-element list, so worker threads started with asyncio.to_thread add to the same count.
+_statements: ContextVar[Optional[List[int]]] = ContextVar('request_db_statements', default=None)
+
+
+def begin_statement_count():
+    """Start counting SQL statements for the current request; pass the token to end_statement_count"""
+    return _statements.set([0])
+
+
+def count_statement() -> bool:
+    """Add one statement to the current count; False when no count is running"""
+    counter = _statements.get()
+    if counter is None:
+        return False
+    counter[0] += 1
+    return True
+
+
+def end_statement_count(token) -> int:
+    count = _statements.get()[0]
+    _statements.reset(token)
+    return count
+
+
+def timed(operation: str, histogram: Histogram = BACKEND_CALL_SECONDS):
+    """Decorate a sync or async callable to record its latency under `operation`"""
+    ok = histogram.labels(operation, 'ok')
+    error = histogram.labels(operation, 'error')
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException:
+                    error.observe(time.perf_counter() - start)
+                    raise
+                ok.observe(time.perf_counter() - start)
+                return result
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                error.observe(time.perf_counter() - start)
+                raise
+            ok.observe(time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+
+def cache_collector(caches: Callable[[], Dict[str, Any]]):
+    """Collector exposing hits, misses and hit ratio of objects with a stats() method"""
+    def collect():
+        hits, misses, ratios, entries = [], [], [], []
+        for name, cache in caches().items():
+            stats = cache.stats()
+            labels = {'cache': name}
+            hits.append((labels, stats.get('hits', 0) + stats.get('stale_hits', 0)))
+            misses.append((labels, stats.get('misses', 0)))
+            ratios.append((labels, stats.get('hit_ratio', 0.0)))
+            if 'entries' in stats:
+                entries.append((labels, stats['entries']))
+        return [
+            ('registry_cache_hits_total', 'counter', 'Cache lookups answered from the cache', hits),
+            ('registry_cache_misses_total', 'counter', 'Cache lookups that missed', misses),
+            ('registry_cache_hit_ratio', 'gauge', 'Hits over lookups since start', ratios),
+            ('registry_cache_entries', 'gauge', 'Entries currently cached', entries),
+        ]
+    return collect
@@ -0,0 +1,27 @@
+"""Move tokens to the token store
+
+Revision ID: 5e8a0f3b6d21
+Revises: c41d7e2a9b53
+Create Date: 2026-10-18 14:31:47.502913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a0f3b6d21'
+down_revision = 'c41d7e2a9b53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Backend tokens now live in the token store; users sign in again once after upgrading
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('token')
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token', sa.VARCHAR(length=500), nullable=True))
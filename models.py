@@ -2,7 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional
 
 db = SQLAlchemy()
 
@@ -33,7 +33,6 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256))  # Increased length to accommodate scrypt hash
-    token = db.Column(db.String(500))
     role = db.Column(db.String(20), default=Role.READER)
     repositories = db.relationship('Repository', backref='owner', lazy=True)
     namespaces = db.Column(db.JSON, default=list)
@@ -63,7 +62,48 @@ class User(UserMixin, db.Model):
             'permissions': self.permissions or []
         }
 
+class UserSnapshot(UserMixin):
+    """Detached, read-only copy of the User fields a request needs.
+
+    Served by load_user from the identity cache so authenticated requests
+    do not have to query the user table. Changes must be made on the User
+    row and followed by an identity cache invalidation. `token` is not part
+    of the row; load_user fills it in from the token store.
+    """
+
+    FIELDS = ('id', 'email', 'role', 'permissions', 'namespaces')
+
+    def __init__(self, id: int, email: str, role: str, permissions: List[str], namespaces: List[str],
+                 token: Optional[str] = None):
+        self.id = id
+        self.email = email
+        self.role = role
+        self.permissions = list(permissions or [])
+        self.namespaces = list(namespaces or [])
+        self.token = token
+
+    @classmethod
+    def fields_of(cls, user: User) -> Dict[str, Any]:
+        return {field: getattr(user, field) for field in cls.FIELDS}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'email': self.email,
+            'namespaces': self.namespaces,
+            'permissions': self.permissions
+        }
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.email}>'
+
 class Repository(db.Model):
+    __table_args__ = (
+        db.Index('ix_repository_namespace', 'namespace'),
+        db.Index('uq_repository_namespace_name', 'namespace', 'name', unique=True),
+        db.Index('ix_repository_owner_id', 'owner_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     url = db.Column(db.String(500), nullable=False)
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -0,0 +1,97 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import base64
+import json
+import math
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Encode pagination state as an opaque URL-safe token"""
+    raw = json.dumps(state, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(state, dict):
+        raise ValueError("Invalid cursor")
+    return state
+
+
+class PageFiller:
+    """Over-fetch backend search batches until `limit` accessible results are found.
+
+    Drive it with a loop over `next_batch()`/`feed()`; it does no I/O itself,
+    so the same logic serves the sync and async search routes. Batch sizes
+    grow with the observed rejection rate and are rounded to powers of two
+    times `limit`, which keeps them stable enough to hit the search cache.
+
+    A short batch does not end the results on its own: backends cap their
+    page size, so it only records the size the backend honours. The results
+    are exhausted on an empty batch, or one shorter than that honoured size.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        offset: int,
+        accept: Callable[[Dict[str, Any]], bool],
+        max_batches: int = 5,
+        max_batch_size: int = 100
+    ):
+        self.limit = max(limit, 1)
+        self.offset = max(offset, 0)
+        self.accept = accept
+        self.max_batches = max_batches
+        self.max_batch_size = max(max_batch_size, self.limit)
+        self.items: List[Dict[str, Any]] = []
+        self.batches = 0
+        self.scanned = 0
+        self.exhausted = False
+        self._requested = 0
+        self._page_cap: Optional[int] = None
+
+    def next_batch(self) -> Optional[Tuple[int, int]]:
+        """Return (offset, limit) for the next backend call, or None when done"""
+        if len(self.items) >= self.limit or self.exhausted or self.batches >= self.max_batches:
+            return None
+
+        remaining = self.limit - len(self.items)
+        if self.scanned:
+            # Assume at least 1 in 10 results is accessible so a barren stretch still terminates
+            ratio = max(len(self.items) / self.scanned, 0.1)
+            wanted = math.ceil(remaining / ratio)
+        else:
+            wanted = remaining
+        size = self.limit
+        while size < wanted and size < self.max_batch_size:
+            size *= 2
+        self._requested = min(size, self.max_batch_size)
+        return self.offset, self._requested
+
+    def feed(self, modules: List[Dict[str, Any]]):
+        """Consume one batch of backend results"""
+        self.batches += 1
+        for module in modules:
+            self.offset += 1
+            self.scanned += 1
+            if self.accept(module):
+                self.items.append(module)
+                if len(self.items) >= self.limit:
+                    # Resume right after the last result we handed out
+                    return
+        if not modules:
+            self.exhausted = True
+        elif len(modules) < self._requested:
+            if self._page_cap is not None and len(modules) < min(self._requested, self._page_cap):
+                self.exhausted = True
+            self._page_cap = max(self._page_cap or 0, len(modules))
+
+    def next_cursor(self) -> Optional[str]:
+        if self.exhausted:
+            return None
+        return encode_cursor({'o': self.offset})
@@ -0,0 +1,147 @@
+from typing import Any, Dict, List, Optional
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME = re.compile(r'^\d+-[0-9a-f]{8}$')
+
+_local = threading.local()
+
+
+class ProfileSession:
+    """One profiled request: the cProfile run plus time spent waiting on the database and backend"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        self.backend_seconds = 0.0
+        self.backend_calls = 0
+
+
+def active() -> Optional[ProfileSession]:
+    """The session profiling the current thread, if any; cheap enough to call on every hot path"""
+    return getattr(_local, 'session', None)
+
+
+class RequestProfiler:
+    """Profiles explicitly requested or randomly sampled requests into `directory`.
+
+    Each profile is a pstats dump (`<name>.prof`) next to a JSON summary
+    (`<name>.json`) with the top of the call tree and DB/backend wait time.
+    Only one request is profiled at a time, since the interpreter supports a
+    single active profiler; requests arriving meanwhile run unprofiled.
+    """
+
+    def __init__(self, directory: str, enabled: bool = True, sample_every: int = 0, keep: int = 100):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_every = sample_every
+        self.keep = keep
+        self._busy = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """False when neither on-demand profiling nor sampling is configured"""
+        return self.enabled or self.sample_every > 0
+
+    def sampled(self) -> bool:
+        return self.sample_every > 0 and random.random() * self.sample_every < 1
+
+    def start(self) -> Optional[ProfileSession]:
+        if not self._busy.acquire(blocking=False):
+            return None
+        session = ProfileSession()
+        try:
+            session.profile.enable()
+        except ValueError as e:
+            # Another profiler (e.g. a debugger) already owns the interpreter
+            logger.debug(f"Profiling skipped: {str(e)}")
+            self._busy.release()
+            return None
+        _local.session = session
+        return session
+
+    def finish(self, session: ProfileSession, meta: Dict[str, Any]) -> Optional[str]:
+        """Stop profiling and write the profile; returns its name"""
+        try:
+            session.profile.disable()
+            duration = time.perf_counter() - session.started
+        finally:
+            _local.session = None
+            self._busy.release()
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+            session.profile.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+
+            call_tree = io.StringIO()
+            pstats.Stats(session.profile, stream=call_tree).sort_stats('cumulative').print_stats(40)
+            summary = dict(
+                meta,
+                name=name,
+                created_at=time.time(),
+                duration=round(duration, 6),
+                db_seconds=round(session.db_seconds, 6),
+                db_queries=session.db_queries,
+                backend_seconds=round(session.backend_seconds, 6),
+                backend_calls=session.backend_calls,
+                call_tree=call_tree.getvalue()
+            )
+            with open(os.path.join(self.directory, f"{name}.json"), 'w') as f:
+                json.dump(summary, f)
+            self._prune()
+            return name
+        except OSError as e:
+            logger.warning(f"Could not store request profile: {str(e)}")
+            return None
+
+    def _prune(self):
+        names = sorted(self._names(), reverse=True)
+        for name in names[self.keep:]:
+            for suffix in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, name + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def _names(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [f[:-5] for f in os.listdir(self.directory) if f.endswith('.json') and PROFILE_NAME.match(f[:-5])]
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Stored profiles, newest first"""
+        summaries = []
+        for name in sorted(self._names(), reverse=True):
+            summary = self.summary(name)
+            if summary is not None:
+                summaries.append(summary)
+        return summaries
+
+    def summary(self, name: str) -> Optional[Dict[str, Any]]:
+        if not PROFILE_NAME.match(name):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{name}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def profile_path(self, name: str) -> Optional[str]:
+        if not PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, f"{name}.prof")
+        return path if os.path.exists(path) else None
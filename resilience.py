@@ -0,0 +1,340 @@
+"""Deadlines and circuit breakers for backend calls.
+
+Every request gets a budget for all of its backend calls
+(BACKEND_REQUEST_BUDGET), and each call, retries included, a budget of its
+own (BACKEND_CALL_BUDGET) cut short by whatever is left of the request's.
+Both live in context variables, so they follow the request into executor
+threads the way tracing spans do.
+
+Each backend endpoint has a circuit breaker. After `failure_threshold`
+consecutive failures it opens and calls fail fast with CircuitOpenError,
+or are answered from a cache where the call site provides a fallback.
+After `reset_timeout` one probe call is let through (half-open); its
+outcome closes the circuit or opens it again.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+import httpx
+import requests
+from urllib3.util.retry import Retry
+
+from tracing import propagate_to_executors
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """The deadline ran out before a backend call could be made"""
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """A backend call was refused without being sent because its endpoint is failing"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RequestBudget:
+    """Time left for the backend calls of one request, and what it was served from caches instead"""
+    __slots__ = ('deadline', 'degraded')
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+_request_budget: ContextVar[Optional[RequestBudget]] = propagate_to_executors(ContextVar('request_budget', default=None))
+_call_deadline: ContextVar[Optional[float]] = propagate_to_executors(ContextVar('call_deadline', default=None))
+
+
+def begin_request(seconds: Optional[float]):
+    """Start the current request's budget; pass the returned token to end_request"""
+    return _request_budget.set(RequestBudget(seconds) if seconds else None)
+
+
+def end_request(token):
+    if token is not None:
+        _request_budget.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, None outside a budgeted request"""
+    budget = _request_budget.get()
+    return budget.remaining() if budget is not None else None
+
+
+def mark_degraded(reason: str):
+    """Record that part of the current response came from a cache because the backend was unavailable"""
+    budget = _request_budget.get()
+    if budget is not None and reason not in budget.degraded:
+        budget.degraded.append(reason)
+
+
+def degraded() -> List[str]:
+    budget = _request_budget.get()
+    return list(budget.degraded) if budget is not None else []
+
+
+@contextmanager
+def call_deadline(budget: Optional[float]):
+    """Deadline of one backend call: `budget` seconds from now, or sooner if the request's budget ends first"""
+    now = time.monotonic()
+    deadline = now + budget if budget else None
+    request_budget = _request_budget.get()
+    if request_budget is not None:
+        deadline = min(deadline, request_budget.deadline) if deadline is not None else request_budget.deadline
+    if deadline is not None and deadline <= now:
+        raise DeadlineExceeded("Request deadline exceeded before the backend call")
+    token = _call_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _call_deadline.reset(token)
+
+
+def bounded_timeout(timeout: Tuple[float, float], deadline: Optional[float]) -> Tuple[float, float]:
+    """(connect, read) timeouts no longer than the time left before deadline"""
+    if deadline is None:
+        return timeout
+    left = max(deadline - time.monotonic(), 0.001)
+    return min(timeout[0], left), min(timeout[1], left)
+
+
+class DeadlineRetry(Retry):
+    """urllib3 Retry that stops retrying, and stops sleeping, at the current call's deadline"""
+
+    def is_exhausted(self) -> bool:
+        deadline = _call_deadline.get()
+        if deadline is not None and time.monotonic() >= deadline:
+            return True
+        return super().is_exhausted()
+
+    def get_backoff_time(self) -> float:
+        return self._within_deadline(super().get_backoff_time())
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return self._within_deadline(retry_after) if retry_after is not None else None
+
+    @staticmethod
+    def _within_deadline(seconds: float) -> float:
+        deadline = _call_deadline.get()
+        if deadline is None:
+            return seconds
+        return min(seconds, max(deadline - time.monotonic(), 0))
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """True for errors that say the backend is unhealthy: 5xx, timeouts and connection failures.
+
+    4xx answers are the backend working as intended, and running out of our
+    own budget before a call says nothing about the backend.
+    """
+    if isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+        return False
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (requests.exceptions.RequestException, httpx.TransportError))
+
+
+def is_unavailable(error: BaseException) -> bool:
+    """True when a request failed because the backend is down, slow or fenced off by its circuit"""
+    return isinstance(error, (DeadlineExceeded, CircuitOpenError)) or is_backend_failure(error)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.opened = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the backend; in half-open state only one probe at a time"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed; backend calls resume")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                if self.state == self.CLOSED:
+                    logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.opened += 1
+
+    def release(self):
+        """End a call that neither proved nor disproved the backend's health"""
+        with self._lock:
+            self.probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
+
+
+class CircuitBreakers:
+    """One breaker per backend endpoint, created on first use with the configured settings"""
+
+    def __init__(self):
+        self.enabled = True
+        self.failure_threshold = 5
+        self.reset_timeout = 30.0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool, failure_threshold: int, reset_timeout: float):
+        self.enabled = enabled
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        with self._lock:
+            for breaker in self._breakers.values():
+                breaker.failure_threshold = failure_threshold
+                breaker.reset_timeout = reset_timeout
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.stats() for name, breaker in list(self._breakers.items())}
+
+
+breakers = CircuitBreakers()
+
+
+def guarded(name: str, fallback: Optional[Callable[..., Any]] = None):
+    """Decorate a sync or async backend call with the circuit breaker for `name`.
+
+    When the circuit is open, or the call fails because the backend is
+    unhealthy or the deadline ran out, `fallback` is called with the same arguments; a value other
+    than None is returned in place of the backend's answer and the request
+    is marked degraded. Otherwise the error propagates. Calls that return a
+    response object (the /auth/* helpers) count a 5xx status as a failure.
+    """
+    def open_error(breaker: CircuitBreaker) -> CircuitOpenError:
+        retry_after = breaker.retry_after()
+        return CircuitOpenError(f"Backend circuit for {name} is open; retrying in {retry_after:.0f}s", retry_after)
+
+    def fall_back(error: Exception, args, kwargs):
+        value = fallback(*args, **kwargs) if fallback is not None else None
+        if value is None:
+            raise error
+        logger.debug(f"{name}: answered from cache while the backend is unavailable: {str(error)}")
+        mark_degraded(name)
+        return value
+
+    def record(breaker: CircuitBreaker, result: Any):
+        if getattr(result, 'status_code', 0) >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def record_error(breaker: CircuitBreaker, error: Exception):
+        if is_backend_failure(error):
+            breaker.record_failure()
+        elif isinstance(error, (DeadlineExceeded, CircuitOpenError)):
+            breaker.release()
+        else:
+            breaker.record_success()
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not breakers.enabled:
+                    return await fn(*args, **kwargs)
+                breaker = breakers.get(name)
+                if not breaker.allow():
+                    return fall_back(open_error(breaker), args, kwargs)
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    record_error(breaker, e)
+                    if is_unavailable(e):
+                        return fall_back(e, args, kwargs)
+                    raise
+                except BaseException:
+                    breaker.release()
+                    raise
+                record(breaker, result)
+                return result
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not breakers.enabled:
+                return fn(*args, **kwargs)
+            breaker = breakers.get(name)
+            if not breaker.allow():
+                return fall_back(open_error(breaker), args, kwargs)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                record_error(breaker, e)
+                if is_unavailable(e):
+                    return fall_back(e, args, kwargs)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            record(breaker, result)
+            return result
+        return wrapper
+    return decorator
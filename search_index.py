@@ -0,0 +1,281 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; every process then syncs on its own
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS modules (
+    id TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    description TEXT,
+    version TEXT,
+    downloads INTEGER DEFAULT 0,
+    document TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    generation INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS modules_namespace ON modules (namespace, downloads DESC);
+CREATE VIRTUAL TABLE IF NOT EXISTS modules_fts USING fts5(
+    namespace, name, provider, description,
+    content='modules', content_rowid='rowid',
+    tokenize="unicode61 tokenchars '-_'"
+);
+CREATE TRIGGER IF NOT EXISTS modules_ai AFTER INSERT ON modules BEGIN
+    INSERT INTO modules_fts (rowid, namespace, name, provider, description)
+    VALUES (new.rowid, new.namespace, new.name, new.provider, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS modules_ad AFTER DELETE ON modules BEGIN
+    INSERT INTO modules_fts (modules_fts, rowid, namespace, name, provider, description)
+    VALUES ('delete', old.rowid, old.namespace, old.name, old.provider, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS modules_au AFTER UPDATE ON modules BEGIN
+    INSERT INTO modules_fts (modules_fts, rowid, namespace, name, provider, description)
+    VALUES ('delete', old.rowid, old.namespace, old.name, old.provider, old.description);
+    INSERT INTO modules_fts (rowid, namespace, name, provider, description)
+    VALUES (new.rowid, new.namespace, new.name, new.provider, new.description);
+END;
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# bm25 column weights: namespace, name, provider, description
+RANK = "bm25(modules_fts, 2.0, 10.0, 2.0, 1.0)"
+
+
+def fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query where every word must match as a prefix"""
+    words = re.findall(r'[\w-]+', query.lower())
+    return ' '.join('"%s"*' % word.replace('"', '""') for word in words)
+
+
+class ModuleSearchIndex:
+    """Local SQLite FTS5 index of module metadata, synced from the backend search API.
+
+    The backend search API has no change feed, so a sync pages through the
+    catalogue but only writes rows whose content changed; modules missing
+    from a completed pass are dropped. Searches are answered with ranking
+    and namespace filtering in a single indexed query.
+    """
+
+    def __init__(self, path: str, max_staleness: float = 900.0):
+        self.path = path
+        self.max_staleness = max_staleness
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._owner_lock = None
+        self.available = True
+        self.local_queries = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            self._connection().executescript(SCHEMA)
+        except sqlite3.OperationalError as e:
+            # e.g. SQLite built without FTS5; searches keep going to the backend
+            logger.warning(f"Module search index disabled: {str(e)}")
+            self.available = False
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _state(self, key: str) -> Optional[str]:
+        row = self._connection().execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def last_synced(self) -> Optional[float]:
+        value = self._state('last_sync_at') if self.available else None
+        return float(value) if value else None
+
+    def is_fresh(self) -> bool:
+        last = self.last_synced()
+        return last is not None and time.time() - last < self.max_staleness
+
+    def sync(self, fetch_page: Callable[[int, int], List[Dict[str, Any]]], page_size: int = 100,
+             max_pages: int = 10000) -> Dict[str, int]:
+        """Pull the backend catalogue page by page, writing only changed rows.
+
+        Only an empty page ends the walk, since the backend may cap the page
+        size below `page_size`. A walk cut short by `max_pages` or by a
+        backend that ignores the offset (a page starting with an id already
+        seen) keeps what it wrote but removes nothing and is not counted as
+        a sync, so the index is never truncated to what a broken walk saw.
+        """
+        if not self.available:
+            return {}
+        with self._sync_lock:
+            connection = self._connection()
+            generation = int(self._state('generation') or 0) + 1
+            counts = {'seen': 0, 'written': 0, 'removed': 0, 'pages': 0}
+            offset = 0
+            first_ids = set()
+            complete = False
+            while counts['pages'] < max_pages:
+                modules = fetch_page(offset, page_size)
+                if not modules:
+                    complete = True
+                    break
+                first_id = tuple(modules[0].get(k) for k in ('namespace', 'name', 'provider'))
+                if first_id in first_ids:
+                    logger.warning(f"Module search index sync stopped at offset {offset}: the backend returned a page already seen")
+                    break
+                first_ids.add(first_id)
+                counts['pages'] += 1
+                self._upsert(connection, modules, generation, counts)
+                offset += len(modules)
+            else:
+                logger.warning(f"Module search index sync stopped after {max_pages} pages")
+
+            connection.execute('BEGIN')
+            state = [('generation', str(generation))]
+            if complete:
+                cursor = connection.execute('DELETE FROM modules WHERE generation < ?', (generation,))
+                counts['removed'] = cursor.rowcount
+                state.append(('last_sync_at', str(time.time())))
+            connection.executemany('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', state)
+            connection.execute('COMMIT')
+            counts['complete'] = complete
+            logger.info(f"Module search index synced: {counts}")
+            return counts
+
+    def _upsert(self, connection: sqlite3.Connection, modules: Iterable[Dict[str, Any]], generation: int, counts: Dict[str, int]):
+        connection.execute('BEGIN')
+        try:
+            for module in modules:
+                if not all(module.get(k) for k in ('namespace', 'name', 'provider')):
+                    continue
+                counts['seen'] += 1
+                module_id = f"{module['namespace']}/{module['name']}/{module['provider']}"
+                document = json.dumps(module, sort_keys=True, default=str)
+                digest = hashlib.sha1(document.encode('utf-8')).hexdigest()
+                row = connection.execute('SELECT digest FROM modules WHERE id = ?', (module_id,)).fetchone()
+                if row and row[0] == digest:
+                    connection.execute('UPDATE modules SET generation = ? WHERE id = ?', (generation, module_id))
+                    continue
+                counts['written'] += 1
+                values = (
+                    module['namespace'], module['name'], module['provider'], module.get('description') or '',
+                    module.get('version'), int(module.get('downloads') or 0), document, digest, generation
+                )
+                if row:
+                    connection.execute(
+                        'UPDATE modules SET namespace = ?, name = ?, provider = ?, description = ?, version = ?, '
+                        'downloads = ?, document = ?, digest = ?, generation = ? WHERE id = ?',
+                        values + (module_id,)
+                    )
+                else:
+                    connection.execute(
+                        'INSERT INTO modules (namespace, name, provider, description, version, downloads, '
+                        'document, digest, generation, id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        values + (module_id,)
+                    )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def search(
+        self,
+        query: str,
+        namespaces: List[str],
+        provider: Optional[str] = None,
+        namespace: Optional[str] = None,
+        limit: int = 10,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Ranked search restricted to the given namespaces"""
+        namespaces = [namespace] if namespace else list(namespaces)
+        if not namespaces:
+            return []
+        placeholders = ', '.join('?' * len(namespaces))
+        filters = f'm.namespace IN ({placeholders})'
+        params: List[Any] = list(namespaces)
+        if provider:
+            filters += ' AND m.provider = ?'
+            params.append(provider)
+
+        match = fts_query(query)
+        if match:
+            sql = (
+                f'SELECT m.document FROM modules_fts JOIN modules m ON m.rowid = modules_fts.rowid '
+                f'WHERE modules_fts MATCH ? AND {filters} ORDER BY {RANK}, m.downloads DESC LIMIT ? OFFSET ?'
+            )
+            params.insert(0, match)
+        else:
+            sql = f'SELECT m.document FROM modules m WHERE {filters} ORDER BY m.downloads DESC, m.id LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        self.local_queries += 1
+        return [json.loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    def owns_sync(self) -> bool:
+        """Take (or confirm) the cross-process lock that elects one process to sync the shared index file"""
+        if self._owner_lock is not None or fcntl is None:
+            return True
+        lock = open(f"{self.path}.sync.lock", 'w')
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        # Held for the life of the process; the OS releases it if the process dies
+        self._owner_lock = lock
+        return True
+
+    def start_background_sync(self, fetch_page: Callable[[int, int], List[Dict[str, Any]]],
+                              interval: float, page_size: int = 100) -> Optional[threading.Thread]:
+        """Sync every `interval` seconds in whichever process holds the sync lock.
+
+        Every worker starts this thread, but only the lock holder pages
+        through the backend; the others retry the lock each interval, so one
+        of them takes over if the syncing process exits.
+        """
+        if not self.available:
+            return None
+
+        def run():
+            while True:
+                if self.owns_sync():
+                    try:
+                        self.sync(fetch_page, page_size)
+                    except Exception as e:
+                        logger.warning(f"Module search index sync failed: {str(e)}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=run, name='search-index-sync', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.available:
+            return {'available': False}
+        count = self._connection().execute('SELECT COUNT(*) FROM modules').fetchone()[0]
+        last = self.last_synced()
+        return {
+            'available': True,
+            'modules': count,
+            'last_sync_at': last,
+            'fresh': self.is_fresh(),
+            'syncing_process': self._owner_lock is not None or fcntl is None,
+            'local_queries': self.local_queries
+        }
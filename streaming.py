@@ -0,0 +1,47 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+import json
+
+from flask import Response, current_app, stream_with_context
+
+
+def json_list_chunks(
+    key: str,
+    items: Iterable[Any],
+    serialize: Callable[[Any], Dict[str, Any]],
+    chunk_size: int = 500,
+    trailer: Optional[Callable[[], Dict[str, Any]]] = None
+) -> Iterator[str]:
+    """Encode {key: [items...], **trailer()} incrementally, `chunk_size` items per chunk.
+
+    `trailer` is called after the last item, so it can report things only
+    known once the rows have been consumed, such as the next cursor.
+    """
+    dumps = current_app.json.dumps
+    yield '{' + json.dumps(key) + ':['
+    buffer = []
+    separator = ''
+    for item in items:
+        buffer.append(dumps(serialize(item)))
+        if len(buffer) >= chunk_size:
+            yield separator + ','.join(buffer)
+            separator = ','
+            buffer = []
+    if buffer:
+        yield separator + ','.join(buffer)
+
+    tail = ']'
+    for name, value in (trailer() if trailer else {}).items():
+        tail += ',' + json.dumps(name) + ':' + dumps(value)
+    yield tail + '}\n'
+
+
+def streamed_json_list(key: str, items: Iterable[Any], serialize: Callable[[Any], Dict[str, Any]],
+                       chunk_size: int = 500, trailer: Optional[Callable[[], Dict[str, Any]]] = None) -> Response:
+    """A chunked application/json response whose memory use does not grow with the number of items.
+
+    Pass a query iterated with `yield_per` so rows are also fetched in batches.
+    """
+    return Response(
+        stream_with_context(json_list_chunks(key, items, serialize, chunk_size, trailer)),
+        mimetype='application/json'
+    )
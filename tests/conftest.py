@@ -0,0 +1,75 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from benchmarks.fake_backend import Dataset, FakeBackend, make_token
+
+
+@pytest.fixture(scope='session')
+def fake_backend():
+    backend = FakeBackend(Dataset(modules=50, versions=5)).start()
+    yield backend
+    backend.stop()
+
+
+@pytest.fixture(scope='session')
+def registry(fake_backend, tmp_path_factory):
+    """The app module against the fake backend and a throwaway SQLite database, with one admin user"""
+    os.environ['BACKEND_URL'] = fake_backend.url
+    os.environ['DATABASE_URL'] = f"sqlite:///{tmp_path_factory.mktemp('db') / 'registry.db'}"
+    import app as registry
+
+    registry.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with registry.app.app_context():
+        registry.db.create_all()
+        user = registry.User(email='admin@example.com', role='admin', permissions=['read:module'])
+        user.set_password('secret')
+        user.namespaces = []
+        registry.db.session.add(user)
+        registry.db.session.commit()
+        registry.test_user_id = user.id
+    return registry
+
+
+@pytest.fixture
+def logged_in(registry):
+    """A test client whose session belongs to the admin user, holding a fresh backend token"""
+    # A token no earlier test has verified
+    registry.token_store.set(registry.test_user_id, make_token(3600, sub='admin@example.com', jti=os.urandom(8).hex()))
+    client = registry.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(registry.test_user_id)
+        session['_fresh'] = True
+    return client
+
+
+@pytest.fixture(scope='session')
+def asgi_get(registry):
+    """GET through the ASGI application; one event loop for the session, as the shared async client expects"""
+    import asgi
+
+    loop = asyncio.new_event_loop()
+
+    def get(path, cookie=None, headers=None):
+        async def fetch():
+            transport = httpx.ASGITransport(app=asgi.application)
+            cookies = {'session': cookie} if cookie else None
+            async with httpx.AsyncClient(transport=transport, base_url='http://registry', cookies=cookies) as client:
+                return await client.get(path, headers=headers)
+        return loop.run_until_complete(fetch())
+
+    yield get
+    loop.close()
+
+
+@pytest.fixture
+def fast_path_only(registry, monkeypatch):
+    """Fail any request the ASGI application hands to the Flask app"""
+    import asgi
+
+    async def no_fallback(scope, receive, send):
+        raise AssertionError(f"{scope['path']} fell back to the Flask app")
+
+    monkeypatch.setattr(asgi, 'wsgi_application', no_fallback)
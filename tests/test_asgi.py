@@ -0,0 +1,55 @@
+import pytest
+
+
+def test_versions_etag_is_the_same_on_both_paths(logged_in, asgi_get, fast_path_only):
+    path = '/v1/modules/hashicorp/vpc-0/aws/versions'
+    flask_response = logged_in.get(path)
+    cookie = logged_in.get_cookie('session').value
+
+    asgi_response = asgi_get(path, cookie)
+
+    assert asgi_response.status_code == flask_response.status_code == 200
+    assert asgi_response.content == flask_response.data
+    assert asgi_response.headers['ETag'] == flask_response.headers['ETag']
+    assert asgi_get(path, cookie, headers={'If-None-Match': flask_response.headers['ETag']}).status_code == 304
+
+
+@pytest.fixture
+def fallbacks(registry, monkeypatch):
+    """Paths the ASGI application hands to the Flask app, answered with an empty 204"""
+    import asgi
+
+    paths = []
+
+    async def record(scope, receive, send):
+        paths.append(scope['path'])
+        await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    monkeypatch.setattr(asgi, 'wsgi_application', record)
+    return paths
+
+
+def test_requests_without_a_session_fall_back_to_flask(asgi_get, fallbacks):
+    path = '/v1/modules/hashicorp/vpc-0/aws/versions'
+
+    assert asgi_get(path).status_code == 204
+    assert asgi_get(path, 'not-a-signed-session').status_code == 204
+    assert fallbacks == [path, path]
+
+
+def test_unverified_sessions_fall_back_to_flask(registry, logged_in, asgi_get, fallbacks):
+    path = '/v1/modules/hashicorp/vpc-0/aws/versions'
+    # The session cookie is issued without a request, so its token has not been verified yet
+    cookie = logged_in.get_cookie('session').value
+
+    assert asgi_get(path, cookie).status_code == 204
+    assert fallbacks == [path]
+
+    assert logged_in.get(path).status_code == 200
+    assert asgi_get(path, cookie).status_code == 200
+    assert fallbacks == [path]
+
+    registry.token_cache.forget(registry.token_store.get(registry.test_user_id))
+    assert asgi_get(path, cookie).status_code == 204
+    assert fallbacks == [path, path]
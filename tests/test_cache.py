@@ -0,0 +1,86 @@
+import threading
+import time
+
+from cache import TTLCache
+
+
+def test_stale_entries_are_served_while_one_background_refresh_runs():
+    cache = TTLCache(ttl=0.05, stale_ttl=10.0)
+    cache.set('key', 'old')
+    time.sleep(0.06)
+    release = threading.Event()
+    refreshes = []
+
+    def loader():
+        refreshes.append(threading.current_thread().name)
+        release.wait(5)
+        return 'new'
+
+    assert cache.get('key') is None
+    assert cache.get_or_load('key', loader) == 'old'
+    assert cache.get_or_load('key', loader) == 'old'
+    release.set()
+    for _ in range(100):
+        if cache.get('key') == 'new':
+            break
+        time.sleep(0.01)
+
+    assert cache.get('key') == 'new'
+    assert len(refreshes) == 1
+    assert refreshes[0] != threading.current_thread().name
+    assert cache.stats()['stale_hits'] == 2
+
+
+def test_failed_refresh_keeps_serving_the_stale_value():
+    cache = TTLCache(ttl=0.05, stale_ttl=10.0)
+    cache.set('key', 'old')
+    time.sleep(0.06)
+    attempts = []
+
+    def failing():
+        attempts.append(1)
+        raise RuntimeError('backend down')
+
+    assert cache.get_or_load('key', failing) == 'old'
+    for _ in range(100):
+        if 'key' not in cache._refreshing:
+            break
+        time.sleep(0.01)
+
+    assert cache.get_or_load('key', failing) == 'old'
+    assert len(attempts) >= 1
+
+
+def test_entries_past_the_stale_window_load_in_the_caller():
+    cache = TTLCache(ttl=0.01, stale_ttl=0.01)
+    cache.set('key', 'old')
+    time.sleep(0.03)
+
+    assert cache.get_or_load('key', lambda: 'new') == 'new'
+    assert cache.stats()['misses'] == 1
+
+
+def test_invalidate_where_drops_only_matching_keys():
+    cache = TTLCache()
+    for key in (('versions', 'a'), ('versions', 'b'), ('search', 'a')):
+        cache.set(key, key[1])
+
+    assert cache.invalidate_where(lambda key: key[0] == 'versions') == 2
+    assert len(cache) == 1
+    assert cache.get(('search', 'a')) == 'a'
+    assert cache.get(('versions', 'a')) is None
+    assert cache.invalidate_where(lambda key: key[0] == 'versions') == 0
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = TTLCache(max_bytes=20, sizeof=len)
+    cache.set('a', 'x' * 8)
+    cache.set('b', 'y' * 8)
+    cache.get('a')
+    cache.set('c', 'z' * 8)
+    cache.set('huge', 'w' * 21)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'x' * 8
+    assert cache.get('huge') is None
+    assert cache.stats()['bytes'] == 16
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from dependencies import DependencyResolver
+
+DEPENDENCIES = {
+    ('hashicorp', 'app', 'aws', '1.0.0'): [
+        {'source': 'hashicorp/vpc/aws', 'version': '~> 2.0'},
+        {'source': 'terraform-aws-modules/network-1/google', 'version': '~> 2.0'},
+        {'source': 'terraform-aws-modules/iam/aws', 'version': '3.1.0'},
+    ],
+    ('hashicorp', 'vpc', 'aws', '2.1.0'): [],
+}
+
+
+def make_resolver(version_calls):
+    def resolve_version(namespace, name, provider, constraint):
+        version_calls.append((namespace, name, provider, constraint))
+        return '2.1.0'
+
+    return DependencyResolver(
+        fetch_direct=lambda *module: {'dependencies': DEPENDENCIES.get(module, [])},
+        resolve_version=resolve_version,
+        executor=ThreadPoolExecutor(max_workers=2)
+    )
+
+
+def test_restricted_namespaces_are_not_pinned():
+    version_calls = []
+    result = make_resolver(version_calls).resolve(
+        'hashicorp', 'app', 'aws', '1.0.0', can_expand=lambda namespace: namespace == 'hashicorp'
+    )
+
+    assert version_calls == [('hashicorp', 'vpc', 'aws', '~> 2.0')]
+    restricted = {node_id: node for node_id, node in result['nodes'].items() if node.get('restricted')}
+    assert set(restricted) == {
+        'terraform-aws-modules/network-1/google@~> 2.0',
+        'terraform-aws-modules/iam/aws@3.1.0',
+    }
+    for node in restricted.values():
+        assert 'version' not in node
+        assert node['constraint']
+    assert 'hashicorp/vpc/aws@2.1.0' in result['nodes']
+
+
+def test_accessible_namespaces_are_pinned():
+    version_calls = []
+    result = make_resolver(version_calls).resolve('hashicorp', 'app', 'aws', '1.0.0')
+
+    assert len(version_calls) == 2
+    assert result['nodes']['terraform-aws-modules/iam/aws@3.1.0']['version'] == '3.1.0'
+    assert not any(node.get('restricted') for node in result['nodes'].values())
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from metrics import Registry, timed
+
+
+def sample_lines(registry):
+    return [line for line in registry.render().splitlines() if not line.startswith('#')]
+
+
+def test_counter_type_help_and_samples_share_one_name():
+    registry = Registry()
+    requests = registry.counter('app_requests_total', 'Requests served', ('method',))
+    requests.labels('GET').inc()
+    requests.labels('GET').inc(2)
+
+    assert registry.render().splitlines() == [
+        '# HELP app_requests_total Requests served',
+        '# TYPE app_requests_total counter',
+        'app_requests_total{method="GET"} 3',
+    ]
+
+
+def test_counter_names_must_end_in_total():
+    with pytest.raises(ValueError):
+        Registry().counter('app_requests', 'Requests served')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.histogram('app_seconds', 'Latency', ('route',), buckets=(0.1, 1.0))
+    child = latency.labels('/search')
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+
+    assert sample_lines(registry) == [
+        'app_seconds_bucket{route="/search",le="0.1"} 2',
+        'app_seconds_bucket{route="/search",le="1"} 3',
+        'app_seconds_bucket{route="/search",le="+Inf"} 4',
+        'app_seconds_count{route="/search"} 4',
+        'app_seconds_sum{route="/search"} 3.65',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('app_errors_total', 'Errors', ('detail',)).labels('say "hi"\\\n').inc()
+
+    assert sample_lines(registry) == ['app_errors_total{detail="say \\"hi\\"\\\\\\n"} 1']
+
+
+def test_collectors_render_after_metrics():
+    registry = Registry()
+    registry.register_collector(lambda: [('app_pool_size', 'gauge', 'Pool size', [({'pool': 'a'}, 4)])])
+
+    assert registry.render().splitlines() == [
+        '# HELP app_pool_size Pool size',
+        '# TYPE app_pool_size gauge',
+        'app_pool_size{pool="a"} 4',
+    ]
+
+
+def test_timed_records_outcome_of_sync_and_async_calls():
+    registry = Registry()
+    calls = registry.histogram('app_call_seconds', 'Calls', ('operation', 'outcome'))
+
+    @timed('fetch', calls)
+    def fetch(fail=False):
+        if fail:
+            raise RuntimeError('boom')
+        return 'ok'
+
+    @timed('afetch', calls)
+    async def afetch():
+        return 'ok'
+
+    assert fetch() == 'ok'
+    with pytest.raises(RuntimeError):
+        fetch(fail=True)
+    assert asyncio.run(afetch()) == 'ok'
+
+    counts = [line for line in sample_lines(registry) if line.startswith('app_call_seconds_count')]
+    assert counts == [
+        'app_call_seconds_count{operation="fetch",outcome="ok"} 1',
+        'app_call_seconds_count{operation="fetch",outcome="error"} 1',
+        'app_call_seconds_count{operation="afetch",outcome="ok"} 1',
+        'app_call_seconds_count{operation="afetch",outcome="error"} 0',
+    ]
+
+
+def test_asgi_fast_path_is_measured(registry, logged_in, asgi_get, fast_path_only):
+    # A Flask request verifies the token, which lets the ASGI fast path serve this session
+    assert logged_in.get('/v1/modules/hashicorp/vpc-0/aws/versions').status_code == 200
+    rule = '/v1/modules/<namespace>/<name>/<provider>/versions'
+    seconds = registry.REQUEST_SECONDS.labels(rule, 'GET', '200')
+    queries = registry.DB_QUERIES.labels(rule)
+    before = sum(seconds.counts), sum(queries.counts)
+
+    response = asgi_get('/v1/modules/hashicorp/vpc-0/aws/versions', logged_in.get_cookie('session').value)
+
+    assert response.status_code == 200
+    assert (sum(seconds.counts), sum(queries.counts)) == (before[0] + 1, before[1] + 1)
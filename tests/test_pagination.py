@@ -0,0 +1,44 @@
+from pagination import PageFiller, decode_cursor
+
+MODULES = [{'namespace': 'ok' if i % 2 else 'hidden', 'id': i} for i in range(100)]
+
+
+def fill(filler, modules, page_cap=None):
+    calls = 0
+    batch = filler.next_batch()
+    while batch is not None:
+        offset, limit = batch
+        calls += 1
+        filler.feed(modules[offset:offset + min(limit, page_cap or limit)])
+        batch = filler.next_batch()
+    return calls
+
+
+def test_capped_backend_is_not_mistaken_for_the_end():
+    filler = PageFiller(limit=10, offset=0, accept=lambda m: m['namespace'] == 'ok', max_batches=10)
+    fill(filler, MODULES, page_cap=5)
+
+    assert len(filler.items) == 10
+    assert decode_cursor(filler.next_cursor()) == {'o': 20}
+
+
+def test_short_page_below_the_honoured_size_ends_the_results():
+    filler = PageFiller(limit=10, offset=0, accept=lambda m: True, max_batches=10)
+    calls = fill(filler, MODULES[:13], page_cap=5)
+
+    assert [m['id'] for m in filler.items] == list(range(10))
+    filler = PageFiller(limit=10, offset=10, accept=lambda m: True, max_batches=10)
+    fill(filler, MODULES[:13], page_cap=5)
+
+    assert [m['id'] for m in filler.items] == [10, 11, 12]
+    assert filler.next_cursor() is None
+    assert calls == 2
+
+
+def test_empty_page_ends_the_results():
+    filler = PageFiller(limit=10, offset=0, accept=lambda m: True)
+    calls = fill(filler, MODULES[:4])
+
+    assert len(filler.items) == 4
+    assert filler.next_cursor() is None
+    assert calls == 2
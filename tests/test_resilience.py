@@ -0,0 +1,179 @@
+import time
+
+import pytest
+import requests
+
+import resilience
+from resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, DeadlineRetry, breakers, call_deadline, guarded,
+    is_backend_failure
+)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+@pytest.fixture
+def request_budget():
+    def begin(seconds):
+        tokens.append(resilience.begin_request(seconds))
+
+    tokens = []
+    yield begin
+    for token in reversed(tokens):
+        resilience.end_request(token)
+
+
+@pytest.fixture
+def fresh_breakers():
+    breakers.configure(True, failure_threshold=2, reset_timeout=0.05)
+    breakers._breakers.clear()
+    yield breakers
+    breakers._breakers.clear()
+    breakers.configure(True, failure_threshold=5, reset_timeout=30.0)
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    breaker = CircuitBreaker('search', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats() == {'state': 'closed', 'consecutive_failures': 0, 'opened': 1, 'rejected': 2}
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker('search', failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.opened == 2
+    assert not breaker.allow()
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker('search', failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize('error, failure', [
+    (http_error(503), True),
+    (http_error(404), False),
+    (requests.exceptions.ConnectTimeout(), True),
+    (DeadlineExceeded(), False),
+    (CircuitOpenError('open'), False),
+    (ValueError(), False),
+])
+def test_only_backend_health_errors_count_as_failures(error, failure):
+    assert is_backend_failure(error) is failure
+
+
+def test_guarded_fails_fast_and_falls_back_while_open(fresh_breakers, request_budget):
+    request_budget(5.0)
+    calls = []
+
+    @guarded('versions', fallback=lambda key: 'cached' if key == 'known' else None)
+    def fetch(key):
+        calls.append(key)
+        raise requests.exceptions.ConnectionError('down')
+
+    assert fetch('known') == 'cached'
+    with pytest.raises(requests.exceptions.ConnectionError):
+        fetch('unknown')
+    assert fresh_breakers.get('versions').state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        fetch('unknown')
+    assert fetch('known') == 'cached'
+    assert len(calls) == 2
+    assert resilience.degraded() == ['versions']
+
+
+def test_client_errors_do_not_open_the_circuit(fresh_breakers):
+    @guarded('details')
+    def fetch():
+        raise http_error(404)
+
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            fetch()
+
+    assert fresh_breakers.get('details').state == CircuitBreaker.CLOSED
+
+
+def test_call_deadline_is_cut_short_by_the_request_budget(request_budget):
+    request_budget(0.5)
+    with call_deadline(10.0) as deadline:
+        assert deadline - time.monotonic() <= 0.5
+
+
+def test_call_deadline_refuses_to_start_once_the_budget_is_spent(request_budget):
+    request_budget(0.01)
+    time.sleep(0.02)
+
+    with pytest.raises(DeadlineExceeded):
+        with call_deadline(10.0):
+            pass
+
+
+def test_retries_stop_and_backoff_shrinks_at_the_deadline():
+    retry = DeadlineRetry(total=5, backoff_factor=10)
+    retry = retry.increment(method='GET', url='/', error=requests.exceptions.ConnectionError())
+    retry = retry.increment(method='GET', url='/', error=requests.exceptions.ConnectionError())
+
+    with call_deadline(0.2):
+        assert not retry.is_exhausted()
+        assert 0 < retry.get_backoff_time() <= 0.2
+    with call_deadline(0.01):
+        time.sleep(0.02)
+        assert retry.is_exhausted()
+        assert retry.get_backoff_time() == 0
+
+
+def verify_expired(token):
+    response = requests.Response()
+    response.status_code = 401
+    return response
+
+
+def test_refresh_outage_keeps_the_session(registry, logged_in, monkeypatch):
+    token = registry.token_store.get(registry.test_user_id)
+
+    def refresh_unavailable(token):
+        raise CircuitOpenError('Backend circuit for /auth/refresh is open', retry_after=5)
+
+    monkeypatch.setattr(registry, 'auth_verify', verify_expired)
+    monkeypatch.setattr(registry, 'auth_refresh', refresh_unavailable)
+    response = logged_in.get('/v1/modules/hashicorp/vpc-0/aws/versions')
+
+    assert response.status_code == 200
+    assert registry.token_store.get(registry.test_user_id) == token
+
+
+def test_refresh_rejection_logs_the_user_out(registry, logged_in, monkeypatch):
+    monkeypatch.setattr(registry, 'auth_verify', verify_expired)
+    monkeypatch.setattr(registry, 'auth_refresh', verify_expired)
+    response = logged_in.get('/v1/modules/hashicorp/vpc-0/aws/versions')
+
+    assert response.status_code == 302
+    assert registry.token_store.get(registry.test_user_id) is None
@@ -0,0 +1,57 @@
+from search_index import ModuleSearchIndex
+
+CATALOGUE = [
+    {'namespace': 'hashicorp', 'name': f'module-{i}', 'provider': 'aws', 'downloads': i}
+    for i in range(250)
+]
+
+
+def capped_backend(cap):
+    def fetch_page(offset, limit):
+        return CATALOGUE[offset:offset + min(limit, cap)]
+    return fetch_page
+
+
+def count(index):
+    return index.stats()['modules']
+
+
+def test_backend_capping_page_size_is_walked_to_the_end(tmp_path):
+    index = ModuleSearchIndex(str(tmp_path / 'index.db'))
+    counts = index.sync(capped_backend(30), page_size=100)
+
+    assert counts['complete']
+    assert count(index) == len(CATALOGUE)
+
+
+def test_backend_ignoring_offset_keeps_existing_rows(tmp_path):
+    index = ModuleSearchIndex(str(tmp_path / 'index.db'))
+    index.sync(capped_backend(100))
+    synced_at = index.last_synced()
+
+    counts = index.sync(lambda offset, limit: CATALOGUE[:limit])
+
+    assert not counts['complete']
+    assert counts['removed'] == 0
+    assert count(index) == len(CATALOGUE)
+    assert index.last_synced() == synced_at
+
+
+def test_max_pages_stops_without_removing(tmp_path):
+    index = ModuleSearchIndex(str(tmp_path / 'index.db'))
+    index.sync(capped_backend(100))
+
+    counts = index.sync(capped_backend(10), max_pages=3)
+
+    assert not counts['complete']
+    assert counts['pages'] == 3
+    assert count(index) == len(CATALOGUE)
+
+
+def test_only_one_index_instance_owns_the_sync(tmp_path):
+    path = str(tmp_path / 'index.db')
+    first, second = ModuleSearchIndex(path), ModuleSearchIndex(path)
+
+    assert first.owns_sync()
+    assert not second.owns_sync()
+    assert first.owns_sync()
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def load():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', load)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', load))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.stats()['coalesced'] < 3:
+        pass
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {'in_flight': 0, 'executions': 1, 'coalesced': 3, 'coalesced_ratio': 0.75}
+
+
+def test_errors_reach_every_waiting_caller_and_the_next_call_retries():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('backend down')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.stats()['coalesced'] < 1:
+        pass
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(errors) == 2
+    assert errors[0] is errors[1]
+    assert flight.do('key', lambda: 'recovered') == 'recovered'
+    assert flight.stats()['executions'] == 2
+
+
+def test_keys_do_not_block_each_other():
+    flight = SingleFlight()
+
+    assert flight.do('a', lambda: flight.do('b', lambda: 'inner')) == 'inner'
+    with pytest.raises(ValueError):
+        flight.do('a', lambda: (_ for _ in ()).throw(ValueError('bad')))
+    assert flight.stats()['in_flight'] == 0
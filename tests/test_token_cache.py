@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+import token_cache
+from benchmarks.fake_backend import make_token
+from token_cache import TokenVerificationCache, token_expiry
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(token_cache, 'time', clock)
+    return clock
+
+
+def test_tokens_inside_the_expiry_margin_are_not_cached():
+    cache = TokenVerificationCache(ttl=60, expiry_margin=30)
+    token = make_token(20)
+    cache.remember(token)
+
+    assert not cache.is_verified(token)
+    assert cache.stats()['entries'] == 0
+
+
+def test_verification_ends_expiry_margin_before_the_token_expires(clock):
+    cache = TokenVerificationCache(ttl=60, expiry_margin=30)
+    token = make_token(50)
+    expires_at = token_expiry(token)
+    cache.remember(token)
+
+    clock.now = expires_at - 31
+    assert cache.is_verified(token)
+    clock.now = expires_at - 30
+    assert not cache.is_verified(token)
+
+
+def test_verification_ends_after_the_ttl(clock):
+    cache = TokenVerificationCache(ttl=60, expiry_margin=30)
+    token = make_token(3600)
+    cache.remember(token)
+
+    clock.now += 59
+    assert cache.is_verified(token)
+    clock.now += 2
+    assert not cache.is_verified(token)
+    assert cache.stats()['entries'] == 0
+
+
+def test_tokens_without_exp_are_cached_for_the_ttl():
+    cache = TokenVerificationCache(ttl=60)
+    cache.remember('opaque-token')
+
+    assert token_expiry('opaque-token') is None
+    assert cache.is_verified('opaque-token')
+    cache.forget('opaque-token')
+    assert not cache.is_verified('opaque-token')
+
+
+def test_oldest_entries_are_evicted_past_max_entries():
+    cache = TokenVerificationCache(max_entries=2)
+    tokens = [make_token(3600, jti=str(i)) for i in range(3)]
+    for token in tokens:
+        cache.remember(token)
+
+    assert [cache.is_verified(token) for token in tokens] == [False, True, True]
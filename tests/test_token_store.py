@@ -0,0 +1,130 @@
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import token_store
+from benchmarks.fake_backend import make_token
+from token_store import MemoryTokenStore, RedisTokenStore, TokenStore, create_token_store
+
+CONFIG = {'TOKEN_STORE_DEFAULT_TTL': 60.0, 'TOKEN_STORE_GRACE': 10.0}
+
+
+class FakeRedis:
+    """The slice of redis.Redis the token store uses, with TTLs recorded instead of enforced"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self.ttls.pop(key, None)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    connected = []
+
+    def from_url(url, **options):
+        connected.append((url, options))
+        return client
+
+    monkeypatch.setattr(token_store, 'redis', SimpleNamespace(Redis=SimpleNamespace(from_url=from_url)))
+    client.connected = connected
+    return client
+
+
+def test_incomplete_store_fails_at_instantiation():
+    class GetOnly(TokenStore):
+        def get(self, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_memory_store_round_trip():
+    store = MemoryTokenStore(default_ttl=60, grace=10)
+    token = make_token(3600)
+    store.set('7', token)
+
+    assert store.get(7) == token
+    store.delete(7)
+    assert store.get(7) is None
+    assert store.stats()['writes'] == 1
+
+
+def test_tokens_outlive_their_expiry_by_the_grace_period():
+    store = MemoryTokenStore(default_ttl=60, grace=10)
+
+    assert 3600 < store.ttl_for(make_token(3600)) <= 3610
+    assert store.ttl_for(make_token(-100)) == 10
+    assert store.ttl_for('not-a-jwt') == 60
+
+
+def test_memory_store_drops_expired_tokens():
+    store = MemoryTokenStore(default_ttl=60, grace=0.05)
+    store.set(1, make_token(0))
+    time.sleep(0.1)
+
+    assert store.get(1) is None
+
+
+def test_redis_store_keys_tokens_with_their_lifetime(fake_redis):
+    store = RedisTokenStore('redis://cache:6379/1', default_ttl=60, grace=10)
+    token = make_token(100)
+    store.set(7, token)
+
+    assert fake_redis.connected == [('redis://cache:6379/1', {'decode_responses': True})]
+    assert store.get('7') == token
+    assert 100 < fake_redis.ttls['registry:token:7'] <= 110
+    store.delete(7)
+    assert store.get(7) is None
+
+
+def test_redis_store_needs_the_redis_package(monkeypatch):
+    monkeypatch.setattr(token_store, 'redis', None)
+
+    with pytest.raises(RuntimeError):
+        RedisTokenStore('redis://cache:6379/1')
+
+
+def test_redis_url_selects_the_redis_store(fake_redis, caplog):
+    with caplog.at_level(logging.WARNING, logger='token_store'):
+        store = create_token_store(dict(CONFIG, TOKEN_STORE_URL='redis://cache:6379/1'))
+
+    assert isinstance(store, RedisTokenStore)
+    assert caplog.text == ''
+
+
+def test_memory_store_warns_outside_debug(caplog):
+    with caplog.at_level(logging.WARNING, logger='token_store'):
+        store = create_token_store(dict(CONFIG, DEBUG=False, TESTING=False))
+
+    assert isinstance(store, MemoryTokenStore)
+    assert 'TOKEN_STORE_URL' in caplog.text
+
+
+def test_memory_store_is_quiet_in_debug(caplog):
+    with caplog.at_level(logging.WARNING, logger='token_store'):
+        create_token_store(dict(CONFIG, DEBUG=True))
+
+    assert caplog.text == ''
+
+
+def test_unsupported_url_warns_and_falls_back(caplog):
+    with caplog.at_level(logging.WARNING, logger='token_store'):
+        store = create_token_store(dict(CONFIG, TOKEN_STORE_URL='memcached://cache:11211', TESTING=True))
+
+    assert isinstance(store, MemoryTokenStore)
+    assert "'memcached'" in caplog.text
@@ -0,0 +1,41 @@
+import flask
+import pytest
+
+import resilience
+from tracing import ContextExecutor, tracer
+
+
+@pytest.fixture
+def executor():
+    with ContextExecutor(max_workers=1) as pool:
+        yield pool
+
+
+def test_tasks_do_not_see_the_flask_request(executor):
+    app = flask.Flask(__name__)
+
+    def peek():
+        with pytest.raises(RuntimeError):
+            flask.g.get('user')
+        with pytest.raises(RuntimeError):
+            flask.request.path
+        return flask.has_request_context(), flask.has_app_context()
+
+    with app.test_request_context('/search'):
+        flask.g.user = 'alice'
+        assert executor.submit(peek).result() == (False, False)
+
+
+def test_tasks_keep_the_span_and_request_budget(executor, tmp_path):
+    tracer.configure(True, str(tmp_path / 'traces.jsonl'))
+    token = resilience.begin_request(5.0)
+    try:
+        with tracer.span('request') as span:
+            seen_span, left = executor.submit(lambda: (tracer.current(), resilience.remaining())).result()
+        assert seen_span is span
+        assert 0 < left <= 5.0
+    finally:
+        resilience.end_request(token)
+        tracer.configure(False, str(tmp_path / 'traces.jsonl'))
+
+    assert executor.submit(resilience.remaining).result() is None
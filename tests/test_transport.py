@@ -0,0 +1,56 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import threading
+
+import pytest
+
+from async_client import AsyncTerraformModuleClient
+from transport import BackendTransport
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    """Sets a cookie on every response and echoes the Cookie header it received"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '').encode()
+        self.send_response(200)
+        self.send_header('Set-Cookie', f"session={self.path.strip('/')}; Path=/")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def cookie_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CookieHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_cookies_from_one_request_are_not_sent_on_the_next(cookie_server):
+    transport = BackendTransport(max_retries=0)
+
+    first = transport.get(f"{cookie_server}/alice")
+    second = transport.get(f"{cookie_server}/bob")
+
+    assert first.cookies.get('session') == 'alice'
+    assert second.text == ''
+    assert len(transport.session.cookies) == 0
+
+
+def test_async_client_keeps_no_cookies(cookie_server):
+    client = AsyncTerraformModuleClient(base_url=cookie_server, max_retries=0)
+
+    async def fetch_twice():
+        try:
+            await client.http.get(f"{cookie_server}/alice")
+            return await client.http.get(f"{cookie_server}/bob")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(fetch_twice()).text == ''
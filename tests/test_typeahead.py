@@ -0,0 +1,90 @@
+import random
+import threading
+
+from typeahead import TypeaheadIndex
+
+
+def test_ranks_every_match_of_a_long_prefix_run():
+    index = TypeaheadIndex()
+    # 'aaa-*' sorts first; the most downloaded matches come last alphabetically
+    index.add_many({'namespace': 'hashicorp', 'name': f"aaa-{i:04d}", 'provider': 'aws', 'downloads': i}
+                   for i in range(1000))
+
+    completions = index.complete('hashicorp/', ['hashicorp'], limit=3)
+
+    assert [c['name'] for c in completions] == ['aaa-0999', 'aaa-0998', 'aaa-0997']
+
+
+def test_matches_name_first_keys_once_and_only_in_given_namespaces():
+    index = TypeaheadIndex()
+    index.add('hashicorp', 'hashicorp-vpc', 'aws', downloads=5)
+    index.add('hashicorp', 'vpc', 'google', downloads=9)
+    index.add('private', 'vpc', 'aws', downloads=100)
+
+    assert [c['id'] for c in index.complete('vpc', ['hashicorp'])] == ['hashicorp/vpc/google']
+    assert [c['id'] for c in index.complete('hashicorp', ['hashicorp'])] == [
+        'hashicorp/vpc/google', 'hashicorp/hashicorp-vpc/aws']
+
+
+def test_rescoring_reorders_completions():
+    index = TypeaheadIndex()
+    index.add('hashicorp', 'vpc', 'aws', downloads=1)
+    index.add('hashicorp', 'vpc', 'google', downloads=2)
+    assert index.complete('vpc', ['hashicorp'])[0]['provider'] == 'google'
+
+    index.add('hashicorp', 'vpc', 'aws', downloads=3)
+    assert index.complete('vpc', ['hashicorp'])[0]['provider'] == 'aws'
+
+
+def test_seeding_does_not_block_other_writers():
+    index = TypeaheadIndex()
+    scanning, release = threading.Event(), threading.Event()
+
+    def slow_scan():
+        yield {'namespace': 'hashicorp', 'name': 'seeded', 'provider': 'aws'}
+        scanning.set()
+        release.wait(5)
+
+    seeder = threading.Thread(target=index.add_many, args=(slow_scan(),))
+    seeder.start()
+    assert scanning.wait(5)
+    writer = threading.Thread(target=index.add, args=('hashicorp', 'searched', 'aws', 1))
+    writer.start()
+    writer.join(1)
+
+    assert not writer.is_alive()
+    release.set()
+    seeder.join(5)
+    assert {c['name'] for c in index.complete('hashicorp/', ['hashicorp'])} == {'seeded', 'searched'}
+
+
+def test_sparse_prefix_in_a_large_namespace():
+    index = TypeaheadIndex()
+    index.add_many({'namespace': 'hashicorp', 'name': f"mod-{i:05d}", 'provider': 'aws', 'downloads': 1000 + i}
+                   for i in range(20000))
+    # Too many matches to rank in full, all below every other module in download order
+    index.add_many({'namespace': 'hashicorp', 'name': f"zz-{i:04d}", 'provider': 'aws', 'downloads': i}
+                   for i in range(1000))
+
+    completions = index.complete('zz-', ['hashicorp'], limit=3)
+
+    assert [c['name'] for c in completions] == ['zz-0999', 'zz-0998', 'zz-0997']
+
+
+def test_matches_a_full_scan_after_batched_and_single_updates():
+    rng = random.Random(7)
+    index = TypeaheadIndex(scan_limit=20)
+    scores = {}
+    for _ in range(30):
+        batch = [{'namespace': 'hashicorp', 'name': f"{rng.choice('abc')}{rng.randrange(150)}", 'provider': 'aws',
+                  'downloads': rng.randrange(50)} for _ in range(rng.choice((1, 5, 40)))]
+        index.add_many(batch)
+        # add_many keeps the first occurrence of a module within a batch
+        for module in reversed(batch):
+            scores[module['name']] = module['downloads']
+
+    for prefix in ('a', 'b1', 'c12', 'hashicorp/', 'hashicorp/a1'):
+        short = prefix.split('/', 1)[1] if prefix.startswith('hashicorp/') else prefix
+        expected = sorted((name for name in scores if name.startswith(short)),
+                          key=lambda name: (-scores[name], f"hashicorp/{name}/aws"))[:5]
+        assert [c['name'] for c in index.complete(prefix, ['hashicorp'], limit=5)] == expected
@@ -0,0 +1,93 @@
+import pytest
+import requests
+
+from versions import VersionIndex, parse_constraint, parse_version
+
+VERSIONS = ['0.9.0', '1.0.0', '1.2.0', '1.2.5', '1.3.0-beta.1', '1.3.0', '1.10.1', '2.0.0-rc.1', '2.0.0', 'latest']
+
+
+@pytest.fixture
+def index():
+    return VersionIndex(VERSIONS)
+
+
+def test_versions_sort_semantically(index):
+    assert index.versions == ['0.9.0', '1.0.0', '1.2.0', '1.2.5', '1.3.0-beta.1', '1.3.0', '1.10.1', '2.0.0-rc.1', '2.0.0']
+    assert parse_version('v1.2') == parse_version('1.2.0')
+    assert parse_version('1.0.0-alpha.2') < parse_version('1.0.0-alpha.10') < parse_version('1.0.0')
+
+
+def test_parse_constraint_reads_operator_and_precision():
+    assert parse_constraint('>= 1.2, < 2, ~> 1.2.3') == [
+        ('>=', parse_version('1.2.0'), 2),
+        ('<', parse_version('2.0.0'), 1),
+        ('~>', parse_version('1.2.3'), 3),
+    ]
+    assert parse_constraint('1.0.0') == [('=', parse_version('1.0.0'), 3)]
+
+
+@pytest.mark.parametrize('constraint', ['>= banana', '~>', '1.2.3.4', '=> 1.0'])
+def test_malformed_constraints_raise(constraint):
+    with pytest.raises(ValueError):
+        parse_constraint(constraint)
+
+
+@pytest.mark.parametrize('constraint, expected', [
+    ('= 1.2.0', ['1.2.0']),
+    ('!= 2.0.0', ['1.10.1', '1.3.0', '1.2.5', '1.2.0', '1.0.0', '0.9.0']),
+    ('> 1.3.0', ['2.0.0', '1.10.1']),
+    ('>= 1.3.0, < 2.0.0', ['1.10.1', '1.3.0']),
+    ('<= 1.0.0', ['1.0.0', '0.9.0']),
+    ('> 1.0.0, < 1.2.5', ['1.2.0']),
+    ('', ['2.0.0', '1.10.1', '1.3.0', '1.2.5', '1.2.0', '1.0.0', '0.9.0']),
+])
+def test_operators(index, constraint, expected):
+    assert index.matching(constraint) == expected
+
+
+def test_pessimistic_constraint_precision(index):
+    # Two components pin the major version, three pin the minor version
+    assert index.matching('~> 1.2') == ['1.10.1', '1.3.0', '1.2.5', '1.2.0']
+    assert index.matching('~> 1.2.0') == ['1.2.5', '1.2.0']
+    assert index.matching('~> 1') == ['1.10.1', '1.3.0', '1.2.5', '1.2.0', '1.0.0']
+
+
+def test_prereleases_only_match_when_named_exactly(index):
+    assert '1.3.0-beta.1' not in index.matching('>= 1.3.0-beta.1')
+    assert index.resolve('= 1.3.0-beta.1') == '1.3.0-beta.1'
+    assert index.resolve('~> 2.0') == '2.0.0'
+    assert index.latest() == '2.0.0'
+    assert VersionIndex(['1.0.0', '1.1.0-rc.1']).latest(include_prerelease=True) == '1.1.0-rc.1'
+
+
+def test_no_match(index):
+    assert index.resolve('> 2.0.0') is None
+    assert index.matching('~> 3.1') == []
+    assert VersionIndex([]).latest() is None
+
+
+def test_from_versions_document():
+    document = {'modules': [{'versions': [{'version': '1.1.0'}, {'version': '1.0.0'}, {}]}]}
+    assert VersionIndex.from_document(document).versions == ['1.0.0', '1.1.0']
+    assert len(VersionIndex.from_document(None)) == 0
+
+
+def test_resolve_route_maps_backend_outages_to_503(registry, logged_in, monkeypatch):
+    def unavailable(*module, **kwargs):
+        raise requests.exceptions.ConnectionError('backend down')
+
+    monkeypatch.setattr(registry, 'version_index', unavailable)
+    response = logged_in.get('/v1/modules/hashicorp/vpc-0/aws/versions/resolve?constraint=~> 1.0')
+
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+
+
+def test_resolve_route(registry, logged_in, fake_backend):
+    versions = fake_backend.dataset.versions[('hashicorp', 'vpc-0', 'aws')]
+    newest = VersionIndex(versions).latest()
+
+    response = logged_in.get('/v1/modules/hashicorp/vpc-0/aws/versions/resolve?constraint=>= 0.0.0')
+
+    assert response.status_code == 200
+    assert response.get_json()['version'] == newest
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def decode_jwt_claims(token: str) -> Dict[str, Any]:
+    """Decode the JWT payload without verifying the signature.
+
+    Only used to read timing claims locally; the backend stays the authority
+    on whether a token is valid.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload.encode('ascii')))
+        return claims if isinstance(claims, dict) else {}
+    except (IndexError, ValueError, UnicodeError):
+        return {}
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Return the token's `exp` claim as a unix timestamp, if present"""
+    exp = decode_jwt_claims(token).get('exp')
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def _token_key(token: str) -> str:
+    # Never keep raw tokens as dict keys
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class TokenVerificationCache:
+    """Remembers positive /auth/verify results per token for a short TTL"""
+
+    def __init__(self, ttl: float = 60.0, expiry_margin: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.expiry_margin = expiry_margin
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def is_verified(self, token: str) -> bool:
+        """True when the token was verified recently and is not close to expiring"""
+        key = _token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                verified_until, expires_at = entry
+                if now < verified_until and (expires_at is None or now < expires_at - self.expiry_margin):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True
+                del self._entries[key]
+            self.misses += 1
+            return False
+
+    def remember(self, token: str):
+        """Record a successful backend verification"""
+        expires_at = token_expiry(token)
+        now = time.time()
+        if expires_at is not None and now >= expires_at - self.expiry_margin:
+            # Not worth caching, the next request would have to re-verify anyway
+            return
+        verified_until = now + self.ttl
+        if expires_at is not None:
+            verified_until = min(verified_until, expires_at - self.expiry_margin)
+        with self._lock:
+            self._entries[_token_key(token)] = (verified_until, expires_at)
+            self._entries.move_to_end(_token_key(token))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, token: str):
+        with self._lock:
+            self._entries.pop(_token_key(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'ttl': self.ttl
+            }
@@ -0,0 +1,176 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+import time
+
+from cache import TTLCache
+from singleflight import SingleFlight
+from token_cache import decode_jwt_claims, token_expiry
+
+try:
+    import redis
+except ImportError:  # only needed for TOKEN_STORE_URL=redis://...
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class TokenStore(ABC):
+    """Backend JWTs per user id, each kept until shortly after the token expires.
+
+    `grace` keeps an expired token around long enough for refresh_token to
+    exchange it; tokens without an `exp` claim are kept for `default_ttl`.
+    """
+
+    def __init__(self, default_ttl: float = 86400.0, grace: float = 3600.0):
+        self.default_ttl = default_ttl
+        self.grace = grace
+        self.writes = 0
+
+    def ttl_for(self, token: str) -> float:
+        expires_at = token_expiry(token)
+        if expires_at is None:
+            return self.default_ttl
+        return max(expires_at - time.time(), 0) + self.grace
+
+    @abstractmethod
+    def get(self, user_id: int) -> Optional[str]:
+        """The user's token, or None if there is none or it has aged out"""
+
+    @abstractmethod
+    def set(self, user_id: int, token: str):
+        """Store the user's token for ttl_for(token) seconds, replacing any previous one"""
+
+    @abstractmethod
+    def delete(self, user_id: int):
+        """Forget the user's token"""
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': type(self).__name__, 'writes': self.writes}
+
+
+class MemoryTokenStore(TokenStore):
+    """Process-local store; every worker of a multi-process deployment sees only its own logins"""
+
+    def __init__(self, default_ttl: float = 86400.0, grace: float = 3600.0, max_entries: int = 100000):
+        super().__init__(default_ttl, grace)
+        self._tokens = TTLCache(ttl=default_ttl, max_entries=max_entries, sizeof=len, name='token_store')
+
+    def get(self, user_id: int) -> Optional[str]:
+        return self._tokens.get(int(user_id))
+
+    def set(self, user_id: int, token: str):
+        self.writes += 1
+        self._tokens.set(int(user_id), token, ttl=self.ttl_for(token))
+
+    def delete(self, user_id: int):
+        self._tokens.invalidate(int(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(super().stats(), **self._tokens.stats())
+
+
+class RedisTokenStore(TokenStore):
+    """Store shared by all workers, with the token lifetime as the Redis key TTL"""
+
+    def __init__(self, url: str, default_ttl: float = 86400.0, grace: float = 3600.0, prefix: str = 'registry:token:'):
+        if redis is None:
+            raise RuntimeError("The redis package is required for a redis:// TOKEN_STORE_URL")
+        super().__init__(default_ttl, grace)
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, user_id: int) -> Optional[str]:
+        return self._redis.get(f"{self.prefix}{int(user_id)}")
+
+    def set(self, user_id: int, token: str):
+        self.writes += 1
+        self._redis.set(f"{self.prefix}{int(user_id)}", token, ex=max(int(self.ttl_for(token)), 1))
+
+    def delete(self, user_id: int):
+        self._redis.delete(f"{self.prefix}{int(user_id)}")
+
+
+def create_token_store(config) -> TokenStore:
+    """Redis store when TOKEN_STORE_URL is a redis:// URL, in-memory otherwise.
+
+    The in-memory store is only fit for a single development process: with
+    several workers, or across a restart, users whose token lives in another
+    process are logged out. Outside debug and testing that is logged loudly.
+    """
+    url = config.get('TOKEN_STORE_URL')
+    options = {'default_ttl': config['TOKEN_STORE_DEFAULT_TTL'], 'grace': config['TOKEN_STORE_GRACE']}
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        logger.info("Using Redis token store")
+        return RedisTokenStore(url, **options)
+    if url:
+        logger.warning(f"Unsupported TOKEN_STORE_URL scheme in {url.split(':', 1)[0]!r}; falling back to the in-memory token store")
+    if not (config.get('DEBUG') or config.get('TESTING')):
+        logger.warning("Using the in-memory token store: backend tokens are lost on restart and not shared "
+                       "between workers, which logs users out. Set TOKEN_STORE_URL=redis://... in production")
+    return MemoryTokenStore(**options)
+
+
+class TokenRefresher:
+    """Refresh each user's token at most once at a time, ideally before it expires.
+
+    `exchange(user_id, token)` calls the backend, stores the new token and
+    returns the token response, or None if the backend refused the token.
+    Concurrent refreshes for one user share a single exchange, and a caller
+    holding a token that was already replaced gets the stored successor
+    instead of spending the old token a second time.
+    """
+
+    def __init__(self, exchange: Callable[[int, str], Optional[Dict[str, Any]]], store: TokenStore,
+                 executor: Executor, refresh_at: float = 0.75):
+        self.exchange = exchange
+        self.store = store
+        self.executor = executor
+        self.refresh_at = refresh_at
+        self._flights = SingleFlight()
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self.background_refreshes = 0
+
+    def refresh(self, user_id: int, token: str) -> Optional[Dict[str, Any]]:
+        def run():
+            current = self.store.get(user_id)
+            if current and current != token:
+                return {'token': current}
+            return self.exchange(user_id, token)
+
+        return self._flights.do(int(user_id), run)
+
+    def is_due(self, token: str) -> bool:
+        """True once the token is past `refresh_at` of its iat..exp lifetime"""
+        claims = decode_jwt_claims(token)
+        issued_at, expires_at = claims.get('iat'), claims.get('exp')
+        if not isinstance(issued_at, (int, float)) or not isinstance(expires_at, (int, float)):
+            return False
+        return time.time() >= issued_at + (expires_at - issued_at) * self.refresh_at
+
+    def refresh_in_background(self, user_id: int, token: str) -> bool:
+        """Schedule a refresh unless one is already pending for this user"""
+        user_id = int(user_id)
+        with self._lock:
+            if user_id in self._scheduled:
+                return False
+            self._scheduled.add(user_id)
+            self.background_refreshes += 1
+
+        def run():
+            try:
+                self.refresh(user_id, token)
+            except Exception as e:
+                logger.warning(f"Background token refresh for user {user_id} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._scheduled.discard(user_id)
+
+        self.executor.submit(run)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._flights.stats(), background_refreshes=self.background_refreshes)
@@ -0,0 +1,213 @@
+"""Lightweight request tracing.
+
+Spans nest through a context variable, so they follow a request through
+nested calls, into asyncio tasks and, via ContextExecutor, into executor
+threads. The current span is sent to the backend as a W3C `traceparent`
+header, and finished spans are appended to a JSON-lines file, one object
+per span, grouped per trace when the root span ends. While tracing is
+disabled `span()` returns a shared no-op context manager.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from contextvars import Context, ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+_NOOP = nullcontext()
+
+# Context variables ContextExecutor tasks inherit from their submitter. Only
+# these cross: Flask's request and app contexts, and with them `g` and the
+# app-scoped database session, must not be shared between threads.
+_propagated: List[ContextVar] = []
+
+
+def propagate_to_executors(var: ContextVar) -> ContextVar:
+    """Register a context variable whose value follows work submitted to a ContextExecutor"""
+    _propagated.append(var)
+    return var
+
+
+class Span:
+    __slots__ = ('name', 'trace', 'trace_id', 'span_id', 'parent_id', 'start', 'started', 'duration',
+                 'attributes', 'error')
+
+    def __init__(self, name: str, trace: '_Trace', trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.attributes = attributes
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3) if self.duration is not None else None,
+            'attributes': self.attributes
+        }
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class _Trace:
+    """Spans of one trace in this process, buffered until the local root finishes"""
+    __slots__ = ('spans', 'closed')
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.closed = False
+
+
+class JsonLinesExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        try:
+            with self._lock, open(self.path, 'a') as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning(f"Could not export trace spans: {str(e)}")
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.exporter: Optional[JsonLinesExporter] = None
+        self._current: ContextVar[Optional[Span]] = propagate_to_executors(ContextVar('current_span', default=None))
+
+    def configure(self, enabled: bool, path: str):
+        self.enabled = enabled
+        self.exporter = JsonLinesExporter(path) if enabled else None
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start(self, name: str, traceparent: Optional[str] = None, **attributes) -> Optional[Span]:
+        """Open a span as a child of the current one, of an incoming traceparent, or as a new root"""
+        if not self.enabled:
+            return None
+        parent = self._current.get()
+        if parent is not None:
+            span = Span(name, parent.trace, parent.trace_id, parent.span_id, attributes)
+        else:
+            match = TRACEPARENT.match(traceparent or '')
+            trace_id, parent_id = (match.group(1), match.group(2)) if match else (os.urandom(16).hex(), None)
+            span = Span(name, _Trace(), trace_id, parent_id, attributes)
+        span.trace.spans.append(span)
+        return span
+
+    def end(self, span: Optional[Span], error: Optional[BaseException] = None):
+        if span is None:
+            return
+        span.duration = time.perf_counter() - span.started
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        trace = span.trace
+        if trace.closed:
+            # Finished after its root, e.g. a background refresh; export on its own
+            self.exporter.export([span])
+        elif trace.spans[0] is span:
+            trace.closed = True
+            self.exporter.export(trace.spans)
+
+    @contextmanager
+    def _span(self, name: str, attributes: Dict[str, Any]):
+        span = self.start(name, **attributes)
+        if span is None:
+            yield None
+            return
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end(span, e)
+            raise
+        else:
+            self.end(span)
+        finally:
+            self._current.reset(token)
+
+    def span(self, name: str, **attributes):
+        """Context manager timing a stage of the current request"""
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, attributes)
+
+    def activate(self, span: Optional[Span]):
+        """Make span current until the returned token is passed to deactivate"""
+        return self._current.set(span) if span is not None else None
+
+    def deactivate(self, token):
+        if token is not None:
+            self._current.reset(token)
+
+    def traceparent(self) -> Optional[str]:
+        """Header value identifying the current span to the backend"""
+        span = self._current.get() if self.enabled else None
+        if span is None:
+            return None
+        return f"00-{span.trace_id}-{span.span_id}-01"
+
+
+tracer = Tracer()
+
+
+def traced(name: str):
+    """Decorate a sync or async callable so every call is a span"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ContextExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that runs each task in a fresh context holding the submitter's propagated variables.
+
+    That carries the current span and backend deadlines into the task, but
+    not the Flask request or app context: tasks get what they need passed in.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        context = Context()
+        for var in _propagated:
+            context.run(var.set, var.get())
+        return super().submit(context.run, fn, *args, **kwargs)
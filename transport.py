@@ -0,0 +1,169 @@
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Any, Optional, Tuple
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import profiling
+import resilience
+from resilience import DeadlineRetry
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the backend (or the proxy in front of it) is briefly unavailable
+RETRY_STATUSES = (502, 503, 504)
+
+
+class RejectAllCookies(DefaultCookiePolicy):
+    """Cookie policy that never stores or sends a cookie"""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+    def return_ok(self, cookie, request) -> bool:
+        return False
+
+
+class BackendTransport:
+    """Pooled keep-alive HTTP transport shared by every call to the registry backend.
+
+    requests.Session is not thread-safe, so each thread gets its own session;
+    they all mount the same HTTPAdapter, whose urllib3 pool is, so keep-alive
+    connections are still shared across threads. A thread serves many
+    users in turn, so its session keeps no cookies: one user's Set-Cookie
+    must never ride along on another user's request.
+
+    Each request, retries and backoff included, ends by its deadline (see
+    resilience.call_deadline): timeouts are shortened to the time left and
+    no retry starts after it.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 20,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.2,
+        call_budget: Optional[float] = 8.0,
+        verify_ssl: bool = True
+    ):
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.call_budget = call_budget
+        self.verify_ssl = verify_ssl
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+
+        # Only idempotent methods are retried; POSTs to /auth/* are never replayed
+        retry = DeadlineRetry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=False
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'BackendTransport':
+        return cls(
+            pool_connections=config.get('BACKEND_POOL_CONNECTIONS', 10),
+            pool_maxsize=config.get('BACKEND_POOL_MAXSIZE', 20),
+            connect_timeout=config.get('BACKEND_CONNECT_TIMEOUT', 3.05),
+            read_timeout=config.get('BACKEND_READ_TIMEOUT', 10.0),
+            max_retries=config.get('BACKEND_MAX_RETRIES', 2),
+            backoff_factor=config.get('BACKEND_RETRY_BACKOFF', 0.2),
+            call_budget=config.get('BACKEND_CALL_BUDGET', 8.0)
+        )
+
+    @property
+    def session(self) -> requests.Session:
+        """The calling thread's session"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            session.headers.update({'Connection': 'keep-alive'})
+            session.cookies.set_policy(RejectAllCookies())
+            self._local.session = session
+        return session
+
+    def request(self, method: str, url: str, timeout: Optional[Any] = None, **kwargs) -> requests.Response:
+        """Send a request over the shared pool within the call's deadline"""
+        kwargs.setdefault('verify', self.verify_ssl)
+        with self._lock:
+            self._requests += 1
+        with resilience.call_deadline(self.call_budget) as deadline, tracer.span(f'http {method}', url=url) as span:
+            # The backend continues the trace from this span
+            traceparent = tracer.traceparent()
+            if traceparent is not None:
+                kwargs['headers'] = dict(kwargs.get('headers') or {}, traceparent=traceparent)
+            profile = profiling.active()
+            started = time.perf_counter() if profile is not None else 0.0
+            try:
+                response = self.session.request(
+                    method, url, timeout=resilience.bounded_timeout(timeout or self.timeout, deadline), **kwargs
+                )
+            except requests.exceptions.RequestException:
+                with self._lock:
+                    self._errors += 1
+                raise
+            finally:
+                if profile is not None:
+                    profile.backend_seconds += time.perf_counter() - started
+                    profile.backend_calls += 1
+            if span is not None:
+                span.set(status=response.status_code)
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool usage for monitoring"""
+        pools = {}
+        manager = self.adapter.poolmanager
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is None:
+                continue
+            idle = pool.pool.qsize() if pool.pool is not None else 0
+            pools[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                'connections_opened': pool.num_connections,
+                'requests': pool.num_requests,
+                'idle': idle,
+                'maxsize': self.pool_maxsize
+            }
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'pool_connections': self.pool_connections,
+                'pool_maxsize': self.pool_maxsize,
+                'timeout': {'connect': self.timeout[0], 'read': self.timeout[1], 'call_budget': self.call_budget},
+                'pools': pools
+            }
+
+    def close(self):
+        self.adapter.close()
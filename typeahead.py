@@ -0,0 +1,155 @@
+from bisect import bisect_left, insort
+from heapq import nsmallest
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+
+Entry = Tuple[str, str, int]
+# (-score, module_id, keys), sorted best first
+Ranked = Tuple[int, str, Tuple[str, ...]]
+
+# Batches up to this size are bisect-inserted or -deleted; larger ones are merged with one pass
+_INSORT_BATCH = 16
+
+
+class TypeaheadIndex:
+    """In-memory prefix index of namespace/name/provider strings.
+
+    Every module is stored under two lowercase keys, "namespace/name/provider"
+    and "name/provider", in one sorted array per namespace. A prefix matches
+    a contiguous run of each array, found by bisecting, so a completion never
+    touches modules the caller cannot see.
+
+    Runs of up to `scan_limit` entries are ranked in full. Longer runs are
+    answered by walking the namespace's modules in download order, where a
+    dense prefix finds its top matches within a few steps. The walk is
+    capped at a few times its expected length; a sparse prefix that runs
+    past the cap is ranked over its own run instead, so a completion costs
+    O(min(run, limit * namespace / run)) rather than O(namespace).
+
+    Writers build new arrays outside the lock, merging in a pre-sorted
+    batch, and swap them in under it; readers need no lock.
+    """
+
+    def __init__(self, scan_limit: int = 200, walk_factor: int = 4):
+        self.scan_limit = scan_limit
+        self.walk_factor = walk_factor
+        # namespace -> (sorted [(key, module_id, score)], modules most downloaded first)
+        self._arrays: Dict[str, Tuple[List[Entry], List[Ranked]]] = {}
+        # module_id -> score
+        self._modules: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+    def add_many(self, modules: Iterable[Dict[str, Any]]):
+        """Add or re-score modules given as dicts with namespace, name, provider and optional downloads"""
+        # Consume the iterable (possibly a database scan) and build sorted entries before taking the lock
+        scores: Dict[str, int] = {}
+        added: Dict[str, List[Entry]] = {}
+        ranked: Dict[str, List[Ranked]] = {}
+        for module in modules:
+            namespace, name, provider = module.get('namespace'), module.get('name'), module.get('provider')
+            if not (namespace and name and provider):
+                continue
+            module_id = f"{namespace}/{name}/{provider}"
+            if module_id in scores:
+                continue
+            scores[module_id] = score = int(module.get('downloads') or 0)
+            full, short = module_id.lower(), f"{name}/{provider}".lower()
+            added.setdefault(namespace, []).extend(((full, module_id, score), (short, module_id, score)))
+            ranked.setdefault(namespace, []).append((-score, module_id, (full, short)))
+        for namespace in added:
+            added[namespace].sort()
+            ranked[namespace].sort()
+
+        with self._lock:
+            previous = {module_id: self._modules[module_id] for module_id in scores if module_id in self._modules}
+            unchanged = {module_id for module_id, score in previous.items() if scores[module_id] == score}
+            self._modules.update(scores)
+            for namespace, new_entries in added.items():
+                new_order = ranked[namespace]
+                if unchanged:
+                    new_entries = [entry for entry in new_entries if entry[1] not in unchanged]
+                    new_order = [item for item in new_order if item[1] not in unchanged]
+                    if not new_entries:
+                        continue
+                entries, order = self._arrays.get(namespace, ([], []))
+                stale = [(previous[item[1]], item[1], item[2]) for item in new_order if item[1] in previous]
+                if stale:
+                    entries, order = _without(entries, order, stale)
+                self._arrays[namespace] = (_merged(entries, new_entries), _merged(order, new_order))
+
+    def add(self, namespace: str, name: str, provider: str, downloads: int = 0):
+        self.add_many([{'namespace': namespace, 'name': name, 'provider': provider, 'downloads': downloads}])
+
+    def complete(self, prefix: str, namespaces: Iterable[str], limit: int = 10) -> List[Dict[str, str]]:
+        """Top `limit` modules whose full or name-first key starts with prefix, most downloaded first"""
+        prefix = prefix.strip().lower()
+        matches: Dict[str, int] = {}
+        for namespace in namespaces:
+            indexed = self._arrays.get(namespace)
+            if not indexed:
+                continue
+            entries, order = indexed
+            start = bisect_left(entries, (prefix,))
+            end = bisect_left(entries, (prefix + '\U0010ffff',), start)
+            if end - start > self.scan_limit:
+                top = self._walk(order, prefix, limit, end - start)
+                if top is not None:
+                    matches.update(top)
+                    continue
+            # A module has two keys, so 2 * limit entries hold at least `limit` modules
+            for _, module_id, score in nsmallest(limit * 2, entries[start:end], key=lambda entry: (-entry[2], entry[1])):
+                matches[module_id] = score
+
+        ranked = sorted(matches.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        results = []
+        for module_id, _ in ranked:
+            namespace, name, provider = module_id.split('/')
+            results.append({'id': module_id, 'namespace': namespace, 'name': name, 'provider': provider})
+        return results
+
+    def _walk(self, order: List[Ranked], prefix: str, limit: int, run: int) -> Optional[Dict[str, int]]:
+        """Top matches from the download order, or None if they are too sparse to find within the cap"""
+        # Each module has two keys, so the run holds at least run / 2 matching modules
+        steps = self.walk_factor * limit * len(order) * 2 // run + limit
+        if steps >= run:
+            return None
+        found: Dict[str, int] = {}
+        for negative_score, module_id, keys in order[:steps]:
+            if keys[0].startswith(prefix) or keys[1].startswith(prefix):
+                found[module_id] = -negative_score
+                if len(found) >= limit:
+                    return found
+        return found if steps >= len(order) else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {'modules': len(self._modules), 'namespaces': len(self._arrays)}
+
+
+def _without(entries: List[Entry], order: List[Ranked],
+             stale: List[Tuple[int, str, Tuple[str, ...]]]) -> Tuple[List[Entry], List[Ranked]]:
+    """Copies of both arrays without the given (old score, module_id, keys) modules"""
+    if len(stale) > _INSORT_BATCH:
+        ids = {module_id for _, module_id, _ in stale}
+        return [entry for entry in entries if entry[1] not in ids], [item for item in order if item[1] not in ids]
+    entries, order = list(entries), list(order)
+    for score, module_id, keys in stale:
+        for key in keys:
+            del entries[bisect_left(entries, (key, module_id, score))]
+        del order[bisect_left(order, (-score, module_id, keys))]
+    return entries, order
+
+
+def _merged(existing: List[Any], batch: List[Any]) -> List[Any]:
+    """A new sorted list of both sorted lists; `existing` is left untouched for readers"""
+    if len(batch) <= _INSORT_BATCH:
+        merged = list(existing)
+        for item in batch:
+            insort(merged, item)
+        return merged
+    # Timsort finds the two sorted runs and merges them in linear time
+    merged = existing + batch
+    merged.sort()
+    return merged
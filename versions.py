@@ -0,0 +1,135 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import re
+
+SEMVER = re.compile(r'^\s*v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?\s*$')
+CONSTRAINT = re.compile(r'^\s*(~>|>=|<=|!=|=|>|<)?\s*(\S+)\s*$')
+
+# A parsed version: (major, minor, patch, is_release, prerelease identifiers)
+VersionKey = Tuple[int, int, int, int, Tuple]
+
+
+def _prerelease_key(prerelease: Optional[str]) -> Tuple:
+    if not prerelease:
+        return ()
+    # Numeric identifiers sort before alphanumeric ones, as in semver 2.0
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in prerelease.split('.'))
+
+
+def parse_version(version: str) -> Optional[VersionKey]:
+    """Parse a semantic version into a sortable key, or None if it is not one"""
+    match = SEMVER.match(version or '')
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return (int(major), int(minor or 0), int(patch or 0), 0 if prerelease else 1, _prerelease_key(prerelease))
+
+
+def parse_constraint(expression: str) -> List[Tuple[str, VersionKey, int]]:
+    """Parse a Terraform version constraint into (operator, version, precision) terms.
+
+    Raises ValueError on malformed input. Precision is the number of
+    components written, which is what `~>` needs.
+    """
+    terms = []
+    for part in (expression or '').split(','):
+        if not part.strip():
+            continue
+        match = CONSTRAINT.match(part)
+        version = SEMVER.match(match.group(2)) if match else None
+        if version is None:
+            raise ValueError(f"Invalid version constraint: {part.strip()}")
+        precision = sum(1 for component in version.groups()[:3] if component is not None)
+        terms.append((match.group(1) or '=', parse_version(match.group(2)), precision))
+    return terms
+
+
+def _bounds(terms: List[Tuple[str, VersionKey, int]]):
+    """Intersect range operators into (lower, lower_inclusive, upper, upper_inclusive)"""
+    lower, lower_inclusive = None, True
+    upper, upper_inclusive = None, True
+
+    def raise_lower(key, inclusive):
+        nonlocal lower, lower_inclusive
+        if lower is None or key > lower or (key == lower and not inclusive):
+            lower, lower_inclusive = key, inclusive
+
+    def drop_upper(key, inclusive):
+        nonlocal upper, upper_inclusive
+        if upper is None or key < upper or (key == upper and not inclusive):
+            upper, upper_inclusive = key, inclusive
+
+    for operator, key, precision in terms:
+        if operator == '=':
+            raise_lower(key, True)
+            drop_upper(key, True)
+        elif operator in ('>', '>='):
+            raise_lower(key, operator == '>=')
+        elif operator in ('<', '<='):
+            drop_upper(key, operator == '<=')
+        elif operator == '~>':
+            # ~> 1.2 allows >= 1.2.0, < 2.0.0; ~> 1.2.3 allows >= 1.2.3, < 1.3.0
+            raise_lower(key, True)
+            major, minor = key[0], key[1]
+            ceiling = (major + 1, 0, 0, 0, ()) if precision <= 2 else (major, minor + 1, 0, 0, ())
+            drop_upper(ceiling, False)
+    return lower, lower_inclusive, upper, upper_inclusive
+
+
+class VersionIndex:
+    """Sorted, pre-parsed versions of one module with constraint resolution by binary search"""
+
+    def __init__(self, versions: Iterable[str]):
+        parsed = {}
+        for version in versions:
+            key = parse_version(version)
+            if key is not None:
+                parsed.setdefault(key, version)
+        self._keys: List[VersionKey] = sorted(parsed)
+        self._versions: List[str] = [parsed[key] for key in self._keys]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def versions(self) -> List[str]:
+        """All versions, oldest first"""
+        return list(self._versions)
+
+    def latest(self, include_prerelease: bool = False) -> Optional[str]:
+        for key, version in zip(reversed(self._keys), reversed(self._versions)):
+            if key[3] or include_prerelease:
+                return version
+        return None
+
+    def _matching(self, constraint: str) -> Iterator[str]:
+        terms = parse_constraint(constraint)
+        lower, lower_inclusive, upper, upper_inclusive = _bounds(terms)
+        start = 0
+        if lower is not None:
+            start = (bisect_left if lower_inclusive else bisect_right)(self._keys, lower)
+        end = len(self._keys)
+        if upper is not None:
+            end = (bisect_right if upper_inclusive else bisect_left)(self._keys, upper)
+
+        excluded = {key for operator, key, _ in terms if operator == '!='}
+        # Prereleases are only selected when a constraint names them exactly
+        exact_prereleases = {key for operator, key, _ in terms if operator == '=' and not key[3]}
+        for i in range(end - 1, start - 1, -1):
+            key = self._keys[i]
+            if key not in excluded and (key[3] or key in exact_prereleases):
+                yield self._versions[i]
+
+    def matching(self, constraint: str) -> List[str]:
+        """Every version satisfying constraint, newest first"""
+        return list(self._matching(constraint))
+
+    def resolve(self, constraint: str) -> Optional[str]:
+        """Newest version satisfying constraint, or None"""
+        return next(self._matching(constraint), None)
+
+    @classmethod
+    def from_document(cls, document: Optional[Dict[str, Any]]) -> 'VersionIndex':
+        """Build from a /v1/modules/.../versions response"""
+        modules = (document or {}).get('modules') or [{}]
+        return cls(v['version'] for v in modules[0].get('versions', []) if v.get('version'))